@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import DailySales, Inventory, Shop
+
+BUCKETS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+SERIES_GROUPS = {
+    "shop": ("shop_id", Shop),
+    "item": ("item_id", Inventory),
+}
+MAX_BUCKETS = 1000
+
+
+def parse_date_range(query_data):
+    if query_data.get("total", None):
+        return None, None
+    start_date = query_data.get("start_date", None)
+    end_date = query_data.get("end_date", None)
+    field = serializers.DateField()
+    try:
+        start_date = field.to_internal_value(start_date) if start_date else None
+        end_date = field.to_internal_value(end_date) if end_date else None
+    except ValidationError as e:
+        raise ValidationError({"date": e.detail})
+    return start_date, end_date
+
+
+def filter_sales_dates(sales, query_data):
+    start_date, end_date = parse_date_range(query_data)
+    if start_date:
+        sales = sales.filter(date__gte=start_date)
+    if end_date:
+        sales = sales.filter(date__lte=end_date)
+    return sales, bool(start_date or end_date)
+
+
+def truncate(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(day, bucket):
+    if bucket == "week":
+        return day + timedelta(days=7)
+    if bucket == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def list_periods(start_date, end_date, bucket):
+    periods = []
+    period = truncate(start_date, bucket)
+    while period <= end_date:
+        periods.append(period)
+        if len(periods) > MAX_BUCKETS:
+            raise ValidationError(
+                {"bucket": [f"More than {MAX_BUCKETS} buckets, narrow the date range"]}
+            )
+        period = next_period(period, bucket)
+    return periods
+
+
+# Sales per shop or item in day/week/month buckets, from one grouped query
+# over the DailySales rollup. Empty buckets are filled with zeros and each
+# series is returned as arrays aligned with `periods`.
+def sales_series(query_data, bucket="month", group_by="shop"):
+    bucket = query_data.get("bucket", bucket)
+    group_by = query_data.get("group_by", group_by)
+    if bucket not in BUCKETS:
+        raise ValidationError({"bucket": [f"Expected one of {', '.join(BUCKETS)}"]})
+    if group_by not in SERIES_GROUPS:
+        raise ValidationError(
+            {"group_by": [f"Expected one of {', '.join(SERIES_GROUPS)}"]}
+        )
+    key, model = SERIES_GROUPS[group_by]
+
+    start_date, end_date = parse_date_range(query_data)
+    sales, _ = filter_sales_dates(DailySales.objects.all(), query_data)
+    rows = list(
+        sales.annotate(period=BUCKETS[bucket]("date"))
+        .values(key, "period")
+        .annotate(quantity=Sum("quantity"), amount=Sum("amount"))
+        .order_by()
+    )
+
+    # A requested range is bucketed even when no sales fall inside it.
+    if rows:
+        start_date = start_date or min(row["period"] for row in rows)
+        end_date = end_date or max(row["period"] for row in rows)
+    periods = []
+    if start_date and end_date:
+        periods = list_periods(start_date, end_date, bucket)
+    positions = {period: index for index, period in enumerate(periods)}
+
+    series = {}
+    for row in rows:
+        entry = series.get(row[key])
+        if entry is None:
+            entry = series[row[key]] = {
+                "id": row[key],
+                "name": None,
+                "quantity": [0] * len(periods),
+                "amount": [0.0] * len(periods),
+            }
+        index = positions[row["period"]]
+        entry["quantity"][index] = row["quantity"]
+        entry["amount"][index] = row["amount"]
+
+    names = model.objects.only("id", "name").in_bulk(
+        [id for id in series if id is not None]
+    )
+    for id, entry in series.items():
+        if id in names:
+            entry["name"] = names[id].name
+
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "periods": [period.isoformat() for period in periods],
+        "series": sorted(
+            series.values(), key=lambda entry: sum(entry["amount"]), reverse=True
+        ),
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppControlConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app_control"
+
+    def ready(self):
+        from . import signals  # noqa: F401
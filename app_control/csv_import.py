@@ -0,0 +1,227 @@
+import codecs
+import csv
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from inventory_api.response_cache import get_response_cache
+from user_control.views import add_user_Activity
+from .models import DashboardCounter, Inventory, InventoryGroup, PhotoBlob
+from .photos import get_photo_store
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class InventoryCSVRowSerializer(serializers.Serializer):
+    group_id = serializers.IntegerField()
+    total = serializers.IntegerField(min_value=0)
+    name = serializers.CharField(max_length=255)
+    price = serializers.FloatField()
+    photo = serializers.CharField(allow_blank=True, allow_null=True, required=False)
+
+    def validate(self, data):
+        # Data URI photos are decoded while validating, so a bad photo fails
+        # its row, and only stored once the row has been written.
+        photo = data.get("photo")
+        if photo and photo.startswith("data:"):
+            try:
+                data["photo_data"] = get_photo_store().decode_data_uri(photo)
+            except Exception as e:
+                raise serializers.ValidationError({"photo": [str(e)]})
+            data["photo"] = None
+        return data
+
+
+class InventoryCSVImporter:
+    def __init__(self, created_by, chunk_size=CHUNK_SIZE, on_chunk=None):
+        self.created_by = created_by
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.chunk_errors = []
+
+    def run(self, data):
+        csv_reader = csv.reader(codecs.iterdecode(data, "utf-8"))
+        # Rows already counted were imported by an earlier, interrupted run.
+        skip = self.rows
+        chunk = []
+        for row in csv_reader:
+            if not row or not row[0] or not str.isdigit(row[0]):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            chunk.append((csv_reader.line_num, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+
+        if self.created_by is not None and (self.created or self.updated):
+            add_user_Activity(
+                self.created_by,
+                f"imported inventory csv - {self.created} added, "
+                f"{self.updated} updated",
+            )
+        return self.report()
+
+    def report(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        self.chunk_errors.append({"row": line, "errors": errors})
+
+    def import_chunk(self, chunk):
+        self.chunk_errors = []
+        # Progress is saved in the chunk's transaction, so it always matches
+        # the rows that were committed.
+        with transaction.atomic():
+            self.write_rows(self.validate_chunk(chunk))
+            # Rows fail while validating or writing; report them in file order.
+            self.chunk_errors.sort(key=lambda error: error["row"])
+            room = max(MAX_REPORTED_ERRORS - len(self.errors), 0)
+            self.errors += self.chunk_errors[:room]
+            if self.on_chunk is not None:
+                self.on_chunk(self)
+
+    def validate_chunk(self, chunk):
+        valid_rows = []
+        for line, row in chunk:
+            self.rows += 1
+            if len(row) < 4:
+                self.add_error(line, {"row": ["Expected group_id,total,name,price"]})
+                continue
+            valid_row = InventoryCSVRowSerializer(
+                data={
+                    "group_id": row[0],
+                    "total": row[1],
+                    "name": row[2],
+                    "price": row[3],
+                    "photo": row[4] if len(row) > 4 else None,
+                }
+            )
+            if not valid_row.is_valid():
+                self.add_error(line, valid_row.errors)
+                continue
+            valid_rows.append((line, valid_row.validated_data))
+
+        group_ids = set(
+            InventoryGroup.objects.filter(
+                id__in={data["group_id"] for _, data in valid_rows}
+            ).values_list("id", flat=True)
+        )
+        checked_rows = []
+        for line, data in valid_rows:
+            if data["group_id"] not in group_ids:
+                self.add_error(line, {"group_id": ["Inventory group does not exist"]})
+                continue
+            checked_rows.append((line, data))
+        return checked_rows
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+
+        try:
+            with transaction.atomic():
+                created, updated = self.write_chunk(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                self.add_error(rows[0][0], {"non_field_errors": [str(e)]})
+                return
+            # One bad row fails the whole bulk write, so retry row by row and
+            # only report the rows the database rejects.
+            for row in rows:
+                self.write_rows([row])
+            return
+
+        self.created += created
+        self.updated += updated
+
+    def write_chunk(self, rows):
+        existing = {}
+        for item in (
+            Inventory.objects.select_for_update()
+            .filter(name__in={data["name"] for _, data in rows})
+            .only("id", "name", "total", "remaining", "price", "created_at")
+            .order_by("id")
+        ):
+            # Like the per-row importer, match the newest item with the name.
+            current = existing.get(item.name)
+            if current is None or item.created_at > current.created_at:
+                existing[item.name] = item
+
+        was_in_stock = {item.id: item.in_stock for item in existing.values()}
+        new_items = {}
+        photos = {}
+        changed = {}
+        for _, data in rows:
+            item = existing.get(data["name"])
+            if item is not None:
+                item.remaining = (item.remaining or 0) + data["total"]
+                item.total += data["total"]
+                item.price = data["price"]
+                changed[item.id] = item
+                continue
+
+            item = new_items.get(data["name"])
+            if item is not None:
+                item.total += data["total"]
+                item.price = data["price"]
+                continue
+
+            new_items[data["name"]] = Inventory(
+                created_by=self.created_by,
+                group_id=data["group_id"],
+                total=data["total"],
+                name=data["name"],
+                price=data["price"],
+                photo=data.get("photo"),
+            )
+            if "photo_data" in data:
+                photos[data["name"]] = data["photo_data"]
+
+        if changed:
+            now = timezone.now()
+            for item in changed.values():
+                item.updated_at = now
+            Inventory.objects.bulk_update(
+                changed.values(), ["remaining", "total", "price", "updated_at"]
+            )
+            DashboardCounter.objects.adjust(
+                "total_inventory",
+                sum(
+                    int(item.in_stock) - int(was_in_stock[item.id])
+                    for item in changed.values()
+                ),
+            )
+        if new_items:
+            Inventory.objects.bulk_create(new_items.values())
+            self.store_photos(new_items, photos)
+        # Bulk writes send no signals, so drop the cached analytics here.
+        get_response_cache().invalidate()
+
+        return len(new_items), len(changed)
+
+    def store_photos(self, new_items, photos):
+        items = []
+        for name, (data, content_type) in photos.items():
+            item = new_items[name]
+            item.photo_blob = PhotoBlob.objects.store(data, content_type)
+            items.append(item)
+        if items:
+            Inventory.objects.bulk_update(items, ["photo_blob"])
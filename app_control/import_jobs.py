@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .csv_import import InventoryCSVImporter
+from .models import InventoryImportJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_JOBS = {
+    "MODE": "thread",
+    "WORKERS": 2,
+    "DIR": "import_jobs",
+    "STALE_AFTER": 600,
+}
+
+
+def get_import_jobs_config():
+    return {**DEFAULT_IMPORT_JOBS, **getattr(settings, "IMPORT_JOBS", {})}
+
+
+def save_upload(data):
+    directory = get_import_jobs_config()["DIR"]
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"{uuid.uuid4().hex}.csv")
+    with open(file_path, "wb") as destination:
+        for chunk in data.chunks():
+            destination.write(chunk)
+    return file_path
+
+
+def submit_import_job(data, created_by):
+    job = InventoryImportJob.objects.create(
+        created_by=created_by, file_path=save_upload(data)
+    )
+    if get_import_jobs_config()["MODE"] == "thread":
+        transaction.on_commit(lambda: submit_jobs([job.id]))
+    return job
+
+
+def submit_jobs(job_ids):
+    # Jobs orphaned by a process that died are picked up with the new one.
+    for job_id in [*reclaim_stale_import_jobs(), *job_ids]:
+        get_executor().submit(run_import_job, job_id)
+
+
+def reclaim_stale_import_jobs():
+    # A running job saves its progress after every chunk; one that hasn't for
+    # STALE_AFTER seconds was left behind by a process that died.
+    now = timezone.now()
+    stale = InventoryImportJob.objects.filter(
+        status="running",
+        updated_at__lt=now - timedelta(seconds=get_import_jobs_config()["STALE_AFTER"]),
+    )
+    job_ids = []
+    for job_id in stale.values_list("id", flat=True):
+        if stale.filter(id=job_id).update(status="pending", updated_at=now):
+            logger.warning("Reclaimed stale inventory import job %s", job_id)
+            job_ids.append(job_id)
+    return job_ids
+
+
+def run_import_job(job_id):
+    close_old_connections()
+    try:
+        now = timezone.now()
+        claimed = InventoryImportJob.objects.filter(id=job_id, status="pending").update(
+            status="running",
+            started_at=Coalesce("started_at", Value(now)),
+            updated_at=now,
+        )
+        if not claimed:
+            return
+
+        job = InventoryImportJob.objects.select_related("created_by").get(id=job_id)
+        importer = InventoryCSVImporter(
+            job.created_by, on_chunk=lambda importer: update_job(job_id, importer)
+        )
+        # A reclaimed job resumes after the rows it already imported.
+        importer.rows = job.rows_processed
+        importer.failed = job.rows_failed
+        importer.created = job.items_created
+        importer.updated = job.items_updated
+        importer.errors = list(job.errors)
+        try:
+            with open(job.file_path, "rb") as data:
+                importer.run(data)
+        except Exception as e:
+            logger.exception("Inventory import job %s failed", job_id)
+            update_job(job_id, importer, status="failed", error=str(e))
+            return
+
+        update_job(job_id, importer, status="completed")
+        os.remove(job.file_path)
+    finally:
+        close_old_connections()
+
+
+def update_job(job_id, importer, **kwargs):
+    now = timezone.now()
+    if "status" in kwargs:
+        kwargs["finished_at"] = now
+    InventoryImportJob.objects.filter(id=job_id).update(
+        rows_processed=importer.rows,
+        rows_failed=importer.failed,
+        items_created=importer.created,
+        items_updated=importer.updated,
+        errors=importer.errors,
+        updated_at=now,
+        **kwargs,
+    )
+
+
+def run_pending_import_jobs():
+    reclaim_stale_import_jobs()
+    job_ids = list(
+        InventoryImportJob.objects.filter(status="pending")
+        .order_by("created_at")
+        .values_list("id", flat=True)
+    )
+    for job_id in job_ids:
+        run_import_job(job_id)
+    return len(job_ids)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_import_jobs_config()["WORKERS"],
+                    thread_name_prefix="inventory-import",
+                )
+    return _executor
@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from inventory_api.response_cache import get_response_cache
+from .models import DailySales, DashboardCounter, Inventory, Invoice, InvoiceItem
+
+
+def create_invoice(invoice_data, invoice_item_data):
+    quantities = defaultdict(int)
+    for line in invoice_item_data:
+        quantities[line["item_id"]] += line["quantity"]
+
+    with transaction.atomic():
+        # Locking in id order keeps concurrent invoices for overlapping
+        # baskets from deadlocking each other.
+        items = {
+            item.id: item
+            for item in Inventory.objects.select_for_update()
+            .filter(id__in=quantities)
+            .only("id", "name", "code", "price", "remaining")
+            .order_by("id")
+        }
+
+        errors = []
+        for item_id, quantity in quantities.items():
+            item = items.get(item_id)
+            if item is None:
+                errors.append(f"item with id - {item_id} does not exist")
+            elif (item.remaining or 0) < quantity:
+                errors.append(
+                    f"item with code - {item.code} does not have enough quantity"
+                )
+        if errors:
+            raise Exception(", ".join(errors))
+
+        Inventory.objects.filter(id__in=quantities).update(
+            remaining=Case(
+                *[
+                    When(id=item_id, then=F("remaining") - quantity)
+                    for item_id, quantity in quantities.items()
+                ]
+            ),
+            updated_at=timezone.now(),
+        )
+        # update() sends no signals; cached analytics embed `remaining`.
+        get_response_cache().invalidate()
+        # Lines that take an item's last units take it out of stock.
+        DashboardCounter.objects.adjust(
+            "total_inventory",
+            -sum(
+                1
+                for item_id, quantity in quantities.items()
+                if items[item_id].remaining == quantity
+            ),
+        )
+
+        invoice = Invoice.objects.create(**invoice_data)
+
+        invoice_items = []
+        for line in invoice_item_data:
+            item = items[line["item_id"]]
+            invoice_items.append(
+                InvoiceItem(
+                    invoice=invoice,
+                    item=item,
+                    item_name=item.name,
+                    item_code=item.code,
+                    quantity=line["quantity"],
+                    amount=item.price * line["quantity"],
+                )
+            )
+        InvoiceItem.objects.bulk_create(invoice_items)
+        DailySales.objects.record(
+            invoice.shop_id,
+            timezone.localdate(invoice.created_at),
+            [(line.item_id, line.quantity, line.amount) for line in invoice_items],
+        )
+
+    return invoice
@@ -0,0 +1,148 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app_control.models import DailySales, Inventory, Shop
+from app_control.serializer import ShopWithAmountSerializer
+from app_control.views import InventoryView
+from inventory_api.fast_read import serialize_many
+from inventory_api.renderers import FastJSONRenderer
+from user_control.models import CustomUser, UserActivities
+from user_control.views import UserActivitiesView, UsersView
+
+
+def list_view(view_class):
+    request = Request(APIRequestFactory().get("/"))
+    return view_class(
+        request=request, action="list", format_kwarg=None, args=(), kwargs={}
+    )
+
+
+def render_list(view_class, queryset=None):
+    view = list_view(view_class)
+    if queryset is None:
+        queryset = view.filter_queryset(view.get_queryset())
+
+    def render():
+        data = view.get_serializer(queryset.all(), many=True).data
+        return FastJSONRenderer().render(data)
+
+    return queryset, render
+
+
+def render_sales_by_shop():
+    queryset = Shop.objects.annotate(
+        amount_total=Subquery(
+            DailySales.objects.filter(shop=OuterRef("pk"))
+            .values("shop")
+            .annotate(amount=Sum("amount"))
+            .values("amount")
+        )
+    ).order_by("-amount_total")
+
+    def render():
+        return FastJSONRenderer().render(
+            serialize_many(ShopWithAmountSerializer, queryset.all())
+        )
+
+    return queryset, render
+
+
+TARGETS = {
+    "inventory": lambda: render_list(InventoryView),
+    "activities": lambda: render_list(UserActivitiesView),
+    "users": lambda: render_list(
+        UsersView, UsersView.queryset.filter(is_superuser=False)
+    ),
+    "sales_by_shop": render_sales_by_shop,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure rows/sec of the read-only list endpoints through the DRF "
+        "serializers and through the fast read path, and check that both "
+        "render the same bytes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=2000,
+            help="Synthetic rows to add to each table for the run; they are "
+            "rolled back afterwards (0 to use the existing data only)",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--target", choices=sorted(TARGETS), action="append", dest="targets"
+        )
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        with transaction.atomic():
+            if options["rows"]:
+                self.add_rows(options["rows"])
+            for name in options["targets"] or TARGETS:
+                queryset, render = TARGETS[name]()
+                count = queryset.count()
+                if not count:
+                    self.stdout.write(f"{name}: no rows")
+                    continue
+                with override_settings(FAST_READ=False):
+                    before, expected = self.measure(render, options["repeat"])
+                with override_settings(FAST_READ=True):
+                    after, content = self.measure(render, options["repeat"])
+
+                line = (
+                    f"{name}: {count} rows, "
+                    f"{count / before:,.0f} -> {count / after:,.0f} rows/sec "
+                    f"({before / after:.1f}x)"
+                )
+                if content != expected:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"{line}, output differs"))
+                else:
+                    self.stdout.write(line)
+            transaction.set_rollback(True)
+
+        if mismatches:
+            raise CommandError(f"{mismatches} target(s) rendered different output")
+
+    def measure(self, render, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            content = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, content
+
+    def add_rows(self, rows):
+        users = CustomUser.objects.bulk_create(
+            CustomUser(
+                email=f"benchmark{n}@example.com",
+                fullname=f"Benchmark User {n}",
+                role="sale",
+            )
+            for n in range(rows)
+        )
+        UserActivities.objects.bulk_create(
+            UserActivities(
+                user=user, email=user.email, fullname=user.fullname, action="benchmark"
+            )
+            for user in users
+        )
+        Inventory.objects.bulk_create(
+            Inventory(name=f"Benchmark item {n}", total=n + 1, price=n / 4)
+            for n in range(rows)
+        )
+        Shop.objects.bulk_create(
+            Shop(name=f"Benchmark shop {n}", created_by=users[n % len(users)])
+            for n in range(rows)
+        )
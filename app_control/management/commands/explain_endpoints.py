@@ -0,0 +1,150 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver
+from rest_framework.test import APIRequestFactory
+
+from inventory_api.utils import get_access_token
+from user_control.models import CustomUser
+
+
+def list_endpoints(patterns=None, prefix=""):
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern).lstrip("^").rstrip("$")
+        if isinstance(pattern, URLResolver):
+            yield from list_endpoints(pattern.url_patterns, route)
+            continue
+        actions = getattr(pattern.callback, "actions", None)
+        # Skip the router's format suffix duplicates and detail routes.
+        if pattern.pattern.regex.groups or not actions:
+            continue
+        if actions.get("get") == "list":
+            yield "/" + route, pattern.callback
+
+
+def find_seq_scans(plan):
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from find_seq_scans(child)
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(find_seq_scans(plan[0]["Plan"]))
+
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [
+            row[-1].split()[-1]
+            for row in cursor.fetchall()
+            if row[-1].startswith("SCAN")
+            and "USING" not in row[-1]
+            and "CONSTANT ROW" not in row[-1]
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Call every list endpoint, EXPLAIN the queries it runs and flag the "
+        "ones that fall back to a sequential scan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Email of the user to call the endpoints as (default: a superuser)",
+        )
+        parser.add_argument(
+            "--endpoint",
+            help="Only check endpoints whose path contains this value",
+        )
+        parser.add_argument(
+            "--planner-defaults",
+            action="store_true",
+            help="Keep sequential scans enabled; on small tables the planner "
+            "prefers them even when a usable index exists",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Exit with an error if any sequential scan is found",
+        )
+
+    def handle(self, *args, **options):
+        # A cached response runs no queries, and entries computed inside the
+        # rolled-back transactions below would outlive them.
+        with override_settings(
+            RESPONSE_CACHE={**settings.RESPONSE_CACHE, "BACKEND": "dummy"}
+        ):
+            self.explain_endpoints(options)
+
+    def explain_endpoints(self, options):
+        user = self.get_user(options["user"])
+        token = get_access_token({"user_id": str(user.id)}, 1)
+        factory = APIRequestFactory()
+
+        flagged = 0
+        for path, view in list_endpoints():
+            if options["endpoint"] and options["endpoint"] not in path:
+                continue
+            request = factory.get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+            queries = []
+
+            def capture(execute, sql, params, many, context):
+                if sql.lstrip().upper().startswith("SELECT"):
+                    queries.append((sql, params))
+                return execute(sql, params, many, context)
+
+            with transaction.atomic():
+                if (
+                    connection.vendor == "postgresql"
+                    and not options["planner_defaults"]
+                ):
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                with connection.execute_wrapper(capture):
+                    response = view(request)
+                scans = []
+                explained = set()
+                for sql, params in queries:
+                    if sql in explained:
+                        continue
+                    explained.add(sql)
+                    for table in explain(sql, params):
+                        scans.append((table, sql))
+                transaction.set_rollback(True)
+
+            if response.status_code >= 400:
+                self.stdout.write(
+                    self.style.WARNING(f"{path}: HTTP {response.status_code}")
+                )
+                continue
+            if not scans:
+                self.stdout.write(f"{path}: {len(queries)} queries, no seq scans")
+                continue
+
+            flagged += 1
+            self.stdout.write(self.style.ERROR(f"{path}: {len(queries)} queries"))
+            for table, sql in scans:
+                self.stdout.write(f"    seq scan on {table}: {sql[:200]}")
+
+        if flagged and options["strict"]:
+            raise CommandError(f"{flagged} endpoint(s) use sequential scans")
+
+    def get_user(self, email):
+        users = CustomUser.objects.all()
+        users = users.filter(email=email) if email else users.filter(is_superuser=True)
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to call the endpoints as")
+        return user
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app_control.models import DailySales
+from inventory_api.response_cache import get_response_cache
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySales rollup from invoice items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--end-date", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        count = DailySales.objects.rebuild(options["start_date"], options["end_date"])
+        get_response_cache().invalidate()
+        self.stdout.write(f"Wrote {count} daily sales row(s)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from app_control.models import InventoryGroup
+from inventory_api.response_cache import get_response_cache
+
+
+class Command(BaseCommand):
+    help = "Recompute inventory group paths from belongs_to"
+
+    def handle(self, *args, **options):
+        count = InventoryGroup.objects.rebuild_paths()
+        get_response_cache().invalidate()
+        self.stdout.write(f"Corrected {count} group path(s)")
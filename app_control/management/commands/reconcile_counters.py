@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_control.models import DashboardCounter
+
+
+class Command(BaseCommand):
+    help = "Recount the dashboard counters and correct any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=0,
+            help="Keep reconciling every POLL seconds instead of exiting",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            previous = dict(DashboardCounter.objects.values_list("name", "value"))
+            for name, value in DashboardCounter.objects.reconcile().items():
+                if previous.get(name) != value:
+                    self.stdout.write(
+                        f"Corrected {name}: {previous.get(name)} -> {value}"
+                    )
+            if not options["poll"]:
+                break
+            time.sleep(options["poll"])
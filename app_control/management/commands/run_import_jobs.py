@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_control.import_jobs import run_pending_import_jobs
+
+
+class Command(BaseCommand):
+    help = "Run pending inventory CSV import jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=0,
+            help="Keep polling for new jobs every POLL seconds instead of exiting",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending_import_jobs()
+            if count:
+                self.stdout.write(f"Ran {count} import job(s)")
+            if not options["poll"]:
+                break
+            time.sleep(options["poll"])
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def build_group_paths(apps, schema_editor):
+    InventoryGroup = apps.get_model("app_control", "InventoryGroup")
+    parents = dict(InventoryGroup.objects.values_list("id", "belongs_to_id"))
+
+    paths = {}
+    for group_id in parents:
+        ancestors = []
+        parent_id = parents[group_id]
+        while parent_id is not None and parent_id not in ancestors:
+            ancestors.insert(0, parent_id)
+            parent_id = parents.get(parent_id)
+        paths[group_id] = "/" + "".join(f"{id}/" for id in ancestors)
+
+    for group_id, path in paths.items():
+        InventoryGroup.objects.filter(id=group_id).update(path=path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0005_inventoryimportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inventorygroup",
+            name="path",
+            field=models.TextField(db_index=True, default="/", editable=False),
+        ),
+        migrations.RunPython(build_group_paths, migrations.RunPython.noop),
+    ]
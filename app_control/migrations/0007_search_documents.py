@@ -0,0 +1,103 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:43
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = {
+    "Inventory": (
+        "name",
+        "code",
+        "group__name",
+        "created_by__email",
+        "created_by__fullname",
+    ),
+    "Shop": ("name", "created_by__email", "created_by__fullname"),
+    "Invoice": ("shop__name", "created_by__email", "created_by__fullname"),
+}
+
+
+# A frozen copy of inventory_api.search.search_document_expression as it was
+# when this migration was written, so later changes to it don't change what
+# this migration does.
+def search_document_expression(model, fields):
+    parts = []
+    for field_name in fields:
+        if "__" in field_name:
+            relation, column = field_name.split("__", 1)
+            related_model = model._meta.get_field(relation).related_model
+            value = Subquery(
+                related_model._default_manager.filter(
+                    pk=OuterRef(f"{relation}_id")
+                ).values(column)[:1]
+            )
+        else:
+            value = F(field_name)
+        if parts:
+            parts.append(Value(" "))
+        parts.append(Coalesce(value, Value(""), output_field=TextField()))
+    return Lower(Concat(*parts, output_field=TextField()))
+
+
+def build_search_documents(apps, schema_editor):
+    for model_name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model("app_control", model_name)
+        model.objects.update(search_document=search_document_expression(model, fields))
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # Search still works without the index, it just scans the column.
+            logger.warning("pg_trgm is not available, skipping trigram search indexes")
+            return
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for model_name in SEARCH_FIELDS:
+            table = apps.get_model("app_control", model_name)._meta.db_table
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_search_trgm "
+                f"ON {table} USING gin (search_document gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for model_name in SEARCH_FIELDS:
+            table = apps.get_model("app_control", model_name)._meta.db_table
+            cursor.execute(f"DROP INDEX IF EXISTS {table}_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0006_inventorygroup_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inventory",
+            name="search_document",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="search_document",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="shop",
+            name="search_document",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
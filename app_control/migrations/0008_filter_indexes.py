@@ -0,0 +1,39 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0007_search_documents"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventory",
+            name="name",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="inventory",
+            name="remaining",
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="inventory",
+            index=models.Index(
+                fields=["-created_at", "id"], name="inventory_created_at_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["-created_at", "id"], name="invoice_created_at_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shop",
+            index=models.Index(fields=["-created_at", "id"], name="shop_created_at_id"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0008_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventory",
+            index=models.Index(
+                condition=models.Q(("remaining__gt", 0)),
+                fields=["id"],
+                name="inventory_in_stock",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventoryimportjob",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["created_at"],
+                name="import_job_pending",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["shop", "created_at"], name="invoice_shop_created_at"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoiceitem",
+            index=models.Index(fields=["created_at"], name="invoiceitem_created_at"),
+        ),
+        migrations.AddIndex(
+            model_name="invoiceitem",
+            index=models.Index(
+                fields=["item", "created_at"], name="invoiceitem_item_created_at"
+            ),
+        ),
+    ]
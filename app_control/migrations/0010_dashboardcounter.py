@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0009_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
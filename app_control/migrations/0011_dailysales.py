@@ -0,0 +1,98 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:52
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_sales(apps, schema_editor):
+    DailySales = apps.get_model("app_control", "DailySales")
+    InvoiceItem = apps.get_model("app_control", "InvoiceItem")
+    totals = (
+        InvoiceItem.objects.annotate(date=TruncDate("invoice__created_at"))
+        .values("invoice__shop_id", "item_id", "date")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_amount=Sum(Coalesce("amount", 0.0)),
+        )
+    )
+    DailySales.objects.bulk_create(
+        [
+            DailySales(
+                shop_id=row["invoice__shop_id"],
+                item_id=row["item_id"],
+                date=row["date"],
+                quantity=row["total_quantity"],
+                amount=row["total_amount"],
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0010_dashboardcounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("quantity", models.BigIntegerField(default=0)),
+                ("amount", models.FloatField(default=0)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_sales",
+                        to="app_control.inventory",
+                    ),
+                ),
+                (
+                    "shop",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_sales",
+                        to="app_control.shop",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-date",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="dailysales",
+            index=models.Index(fields=["date"], name="daily_sales_date"),
+        ),
+        migrations.AddIndex(
+            model_name="dailysales",
+            index=models.Index(fields=["item", "date"], name="daily_sales_item_date"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailysales",
+            constraint=models.UniqueConstraint(
+                Coalesce("shop", 0),
+                Coalesce("item", 0),
+                models.F("date"),
+                name="daily_sales_shop_item_date",
+            ),
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
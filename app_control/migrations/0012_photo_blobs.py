@@ -0,0 +1,137 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:58
+
+import base64
+import hashlib
+import io
+import os
+from urllib.parse import unquote_to_bytes
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import django.db.models.deletion
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# A frozen copy of the photo store as it was when this migration was written,
+# so later changes to app_control.photos don't change what it does.
+IMAGE_CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+
+def decode_photo(value, max_size):
+    header, _, payload = value.partition(",")
+    if header.endswith(";base64"):
+        data = base64.b64decode(payload, validate=True)
+    else:
+        data = unquote_to_bytes(payload)
+    if len(data) > max_size:
+        return None
+    image = Image.open(io.BytesIO(data))
+    image.verify()
+    if image.format not in IMAGE_CONTENT_TYPES:
+        return None
+    return data, IMAGE_CONTENT_TYPES[image.format]
+
+
+def make_thumbnail(data, size):
+    image = Image.open(io.BytesIO(data))
+    image.thumbnail(size)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=85)
+    return output.getvalue()
+
+
+def save_photo(config, key, data):
+    if config.get("BACKEND", "local") == "storage":
+        name = f"{config.get('PREFIX', 'photos')}/{key[:2]}/{key}"
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+        return
+    path = os.path.join(str(config.get("DIR", "photos")), key[:2], key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as destination:
+        destination.write(data)
+
+
+def move_photos_to_store(apps, schema_editor):
+    if Image is None:
+        # Without Pillow photos can't be verified; they stay as data URIs.
+        return
+    Inventory = apps.get_model("app_control", "Inventory")
+    PhotoBlob = apps.get_model("app_control", "PhotoBlob")
+    config = getattr(settings, "PHOTO_STORE", {})
+    max_size = config.get("MAX_SIZE", 5 * 1024 * 1024)
+    thumbnail_size = config.get("THUMBNAIL_SIZE", (200, 200))
+
+    items = Inventory.objects.filter(photo__startswith="data:").only("id", "photo")
+    for item in items.iterator(chunk_size=100):
+        try:
+            photo = decode_photo(item.photo, max_size)
+        except Exception:
+            continue
+        if photo is None:
+            continue
+        data, content_type = photo
+        digest = hashlib.sha256(data).hexdigest()
+        if not PhotoBlob.objects.filter(digest=digest).exists():
+            save_photo(config, digest, data)
+            try:
+                save_photo(
+                    config, f"{digest}.thumb", make_thumbnail(data, thumbnail_size)
+                )
+                has_thumbnail = True
+            except Exception:
+                has_thumbnail = False
+            PhotoBlob.objects.create(
+                digest=digest,
+                content_type=content_type,
+                size=len(data),
+                has_thumbnail=has_thumbnail,
+            )
+        Inventory.objects.filter(id=item.id).update(photo_blob_id=digest, photo=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_control", "0011_dailysales"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PhotoBlob",
+            fields=[
+                (
+                    "digest",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("content_type", models.CharField(max_length=100)),
+                ("size", models.PositiveIntegerField()),
+                ("has_thumbnail", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="inventory",
+            name="photo_blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="app_control.photoblob",
+            ),
+        ),
+        migrations.RunPython(move_photos_to_store, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,106 @@
-from django.db import models
+import hashlib
+
+from django.db import models, connection, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr, TruncDate
+from django.utils import timezone
 from user_control.views import add_user_Activity
 from user_control.models import CustomUser
+from inventory_api.search import build_search_document, refresh_search_documents
+from .photos import get_photo_store
+
+MAX_GROUP_DEPTH = 10
+
+
+class InventoryGroupManager(models.Manager):
+    def subtree_q(self, group_id, prefix=""):
+        path = self.filter(id=group_id).values_list("path", flat=True).first()
+        if path is None:
+            return Q(pk__in=[])
+        return Q(**{f"{prefix}id": group_id}) | Q(
+            **{f"{prefix}path__startswith": f"{path}{group_id}/"}
+        )
+
+    # Attaches `subtree_items` (items in the group and every group below it)
+    # to each group. Descendants are matched with constant path prefixes and
+    # items counted per group_id, so both queries are served by indexes.
+    def load_subtree_items(self, groups):
+        if not groups:
+            return groups
+        prefixes = {group.pk: f"{group.path}{group.pk}/" for group in groups}
+        descendants = Q(id__in=prefixes)
+        for prefix in set(prefixes.values()):
+            descendants |= Q(path__startswith=prefix)
+        paths = dict(self.filter(descendants).order_by().values_list("id", "path"))
+        counts = dict(
+            Inventory.objects.filter(group_id__in=paths)
+            .order_by()
+            .values("group_id")
+            .annotate(count=Count("id"))
+            .values_list("group_id", "count")
+        )
+        for group in groups:
+            group.subtree_items = counts.get(group.pk, 0) + sum(
+                counts.get(id, 0)
+                for id, path in paths.items()
+                if path.startswith(prefixes[group.pk])
+            )
+        return groups
+
+    # Attaches `ancestors` (root first, as (id, name) pairs) to each group,
+    # resolving the ids stored in every group's path with one query instead
+    # of following belongs_to lazily one level at a time.
+    def load_ancestors(self, groups, max_depth=MAX_GROUP_DEPTH):
+        groups = [group for group in groups if group is not None]
+        chains = {}
+        for group in groups:
+            chains[group.pk] = [int(id) for id in group.path.split("/") if id]
+            chains[group.pk] = chains[group.pk][-max_depth:]
+
+        ancestor_ids = {id for chain in chains.values() for id in chain}
+        names = dict(self.filter(id__in=ancestor_ids).values_list("id", "name"))
+        for group in groups:
+            group.ancestors = [
+                (id, names[id]) for id in chains[group.pk] if id in names
+            ]
+        return groups
+
+    # Recomputes every path from belongs_to. Paths are kept in step by
+    # InventoryGroup.save() and delete(), so this repairs trees changed
+    # through queryset updates, bulk_create() or raw SQL. Returns the number
+    # of groups whose path was corrected.
+    def rebuild_paths(self):
+        with transaction.atomic():
+            groups = {
+                id: (belongs_to_id, path)
+                for id, belongs_to_id, path in self.select_for_update()
+                .order_by()
+                .values_list("id", "belongs_to_id", "path")
+            }
+            paths = {}
+            for id in groups:
+                chain = []
+                parent = id
+                while parent is not None and parent not in paths:
+                    if parent in chain:
+                        raise Exception(
+                            f"group with id - {parent} belongs to its own subgroup"
+                        )
+                    chain.append(parent)
+                    parent = groups[parent][0]
+                path = "/" if parent is None else f"{paths[parent]}{parent}/"
+                for group_id in reversed(chain):
+                    paths[group_id] = path
+                    path = f"{path}{group_id}/"
+
+            now = timezone.now()
+            stale = [
+                self.model(id=id, path=path, updated_at=now)
+                for id, path in paths.items()
+                if groups[id][1] != path
+            ]
+            self.bulk_update(stale, ["path", "updated_at"], batch_size=1000)
+        return len(stale)
 
 
 class InventoryGroup(models.Model):
@@ -18,34 +118,165 @@ class InventoryGroup(models.Model):
         related_name="groups_relations",
         blank=True,
     )
+    # Ids of every ancestor, root first: "/" for a top-level group, "/1/4/"
+    # for a group under 4 under 1. Subtrees are matched with a prefix scan.
+    # save() and delete() keep it in step; after changing belongs_to any
+    # other way, run the rebuild_paths command.
+    path = models.TextField(default="/", db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InventoryGroupManager()
+
     class Meta:
         ordering = ("name",)
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.old_name = self.name
+        # Read through __dict__ so deferred fields (e.g. rows the deletion
+        # collector loads with only()) are not fetched one query at a time.
+        self.old_name = self.__dict__.get("name")
+        self.old_path = self.__dict__.get("path")
+
+    @property
+    def subtree_path(self):
+        return f"{self.path}{self.pk}/"
+
+    def build_path(self):
+        if not self.belongs_to_id:
+            return "/"
+        parent_path = (
+            InventoryGroup.objects.filter(id=self.belongs_to_id)
+            .values_list("path", flat=True)
+            .first()
+        )
+        if parent_path is None:
+            raise Exception(f"group with id - {self.belongs_to_id} does not exist")
+        path = f"{parent_path}{self.belongs_to_id}/"
+        if self.pk is not None and f"/{self.pk}/" in path:
+            raise Exception(f"group - '{self.name}' cannot belong to its own subgroup")
+        return path
+
+    def move_subtree(self, old_prefix, new_prefix):
+        InventoryGroup.objects.filter(path__startswith=old_prefix).update(
+            path=Concat(
+                Value(new_prefix),
+                Substr("path", len(old_prefix) + 1),
+                output_field=models.TextField(),
+            )
+        )
 
     def save(self, *args, **kwargs):
         is_new = self.pk is not None
         action = f"added new group - '{self.name}'"
         if is_new:
             action = f"updated new group - '{self.old_name}' to '{self.name}'"
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.path = self.build_path()
+            super().save(*args, **kwargs)
+            if is_new and self.old_path and self.path != self.old_path:
+                self.move_subtree(f"{self.old_path}{self.pk}/", self.subtree_path)
+            if is_new and self.name != self.old_name:
+                refresh_search_documents(Inventory.objects.filter(group_id=self.pk))
+        self.old_name = self.name
+        self.old_path = self.path
         add_user_Activity(self.created_by, action)
 
     def delete(self, *args, **kwargs):
         created_by = self.created_by
         action = f"deleted group - '{self.name}'"
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            item_ids = list(self.group_inventories.values_list("id", flat=True))
+            # Direct children become top-level groups (belongs_to is SET_NULL).
+            self.move_subtree(self.subtree_path, "/")
+            super().delete(*args, **kwargs)
+            refresh_search_documents(Inventory.objects.filter(id__in=item_ids))
         add_user_Activity(created_by, action)
 
     def __str__(self) -> str:
         return self.name
 
 
+class PhotoBlobManager(models.Manager):
+    def store(self, data, content_type):
+        blob = self.filter(digest=hashlib.sha256(data).hexdigest()).first()
+        if blob is not None:
+            return blob
+        digest, has_thumbnail = get_photo_store().save(data)
+        blob, _ = self.get_or_create(
+            digest=digest,
+            defaults={
+                "content_type": content_type,
+                "size": len(data),
+                "has_thumbnail": has_thumbnail,
+            },
+        )
+        return blob
+
+    def store_data_uri(self, value):
+        return self.store(*get_photo_store().decode_data_uri(value))
+
+
+class PhotoBlob(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+    has_thumbnail = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PhotoBlobManager()
+
+    def __str__(self) -> str:
+        return self.digest
+
+
+class InventoryManager(models.Manager):
+    def allocate_ids(self, count):
+        if count <= 0:
+            return []
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                    "FROM generate_series(1, %s)",
+                    [table, count],
+                )
+                return [row[0] for row in cursor.fetchall()]
+            # SQLite serializes writers, so continuing from the highest id
+            # handed out is sufficient there. Recording the reservation in
+            # sqlite_sequence keeps ids of deleted rows and of earlier
+            # allocations in this transaction from being handed out again;
+            # unlike a Postgres sequence, it is undone by a rollback.
+            cursor.execute(
+                f"SELECT MAX(COALESCE(MAX(id), 0), "
+                f"COALESCE((SELECT seq FROM sqlite_sequence WHERE name = %s), 0)) "
+                f"FROM {table}",
+                [table],
+            )
+            last_id = cursor.fetchone()[0]
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name = %s", [table])
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, last_id + count],
+            )
+        return list(range(last_id + 1, last_id + count + 1))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.attach_photo()
+        new_items = [obj for obj in objs if obj.pk is None]
+        for obj, item_id in zip(new_items, self.allocate_ids(len(new_items))):
+            obj.prepare_new(item_id)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        refresh_search_documents(self.filter(id__in=[obj.id for obj in new_items]))
+        DashboardCounter.objects.adjust(
+            "total_inventory", sum(1 for obj in objs if obj.in_stock)
+        )
+        return objs
+
+
 class Inventory(models.Model):
     created_by = models.ForeignKey(
         CustomUser,
@@ -54,7 +285,11 @@ class Inventory(models.Model):
         on_delete=models.SET_NULL,
     )
     code = models.CharField(null=True, blank=True, max_length=10, unique=True)
+    # Data URIs written here are moved into the photo store on save.
     photo = models.TextField(blank=True, null=True)
+    photo_blob = models.ForeignKey(
+        PhotoBlob, null=True, blank=True, related_name="+", on_delete=models.SET_NULL
+    )
     group = models.ForeignKey(
         InventoryGroup,
         on_delete=models.SET_NULL,
@@ -62,27 +297,62 @@ class Inventory(models.Model):
         null=True,
     )
     total = models.PositiveIntegerField()
-    remaining = models.PositiveIntegerField(null=True, blank=True)
-    name = models.CharField(max_length=255)
+    remaining = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    name = models.CharField(max_length=255, db_index=True)
     price = models.FloatField(default=0)
+    search_document = models.TextField(default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InventoryManager()
+
+    SEARCH_FIELDS = (
+        "name",
+        "code",
+        "group__name",
+        "created_by__email",
+        "created_by__fullname",
+    )
+
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at", "id"], name="inventory_created_at_id"),
+            # SummaryView counts items that are still in stock.
+            models.Index(
+                fields=["id"], condition=Q(remaining__gt=0), name="inventory_in_stock"
+            ),
+        ]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.old_remaining = self.__dict__.get("remaining")
+
+    @property
+    def in_stock(self):
+        return (self.remaining or 0) > 0
+
+    def prepare_new(self, item_id):
+        self.id = item_id
+        self.code = f"ITEM{item_id:06d}"
+        self.remaining = self.total
+
+    def attach_photo(self):
+        photo = self.__dict__.get("photo")
+        if photo and photo.startswith("data:"):
+            self.photo_blob = PhotoBlob.objects.store_data_uri(self.photo)
+            self.photo = None
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        self.attach_photo()
         if is_new:
-            self.remaining = self.total
+            self.prepare_new(Inventory.objects.allocate_ids(1)[0])
+            kwargs["force_insert"] = True
+        self.search_document = build_search_document(self, self.SEARCH_FIELDS)
         super().save(*args, **kwargs)
+        self.old_remaining = self.remaining
 
-        if is_new:
-            id_length = len(str(self.id))
-            code_length = 6 - id_length
-            zeros = "".join("0" for i in range(code_length))
-            self.code = f"ITEM{zeros}{self.id}"
-            self.save()
         action = f"added new inventory item with code - '{self.code}'"
         if not is_new:
             action = f"updated inventory item with code - '{self.code}'"
@@ -107,34 +377,57 @@ class Shop(models.Model):
         on_delete=models.SET_NULL,
     )
     name = models.CharField(max_length=50, unique=True)
+    search_document = models.TextField(default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    SEARCH_FIELDS = ("name", "created_by__email", "created_by__fullname")
+
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at", "id"], name="shop_created_at_id")
+        ]
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.old_name = self.name
+        self.old_name = self.__dict__.get("name")
 
     def save(self, *args, **kwargs):
         is_new = self.pk is not None
         action = f"added new shop - '{self.name}'"
         if is_new:
             action = f"updated new shop - '{self.old_name}' to '{self.name}'"
-        super().save(*args, **kwargs)
+        self.search_document = build_search_document(self, self.SEARCH_FIELDS)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new and self.name != self.old_name:
+                refresh_search_documents(Invoice.objects.filter(shop_id=self.pk))
+        self.old_name = self.name
         add_user_Activity(self.created_by, action)
 
     def delete(self, *args, **kwargs):
         created_by = self.created_by
         action = f"deleted shop - '{self.name}'"
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            invoice_ids = list(self.sale_shop.values_list("id", flat=True))
+            super().delete(*args, **kwargs)
+            refresh_search_documents(Invoice.objects.filter(id__in=invoice_ids))
         add_user_Activity(created_by, action)
 
     def __str__(self) -> str:
         return self.name
 
 
+class InvoiceQuerySet(models.QuerySet):
+    def delete(self):
+        # Bulk deletes skip Invoice.delete(), so take the lines out of the
+        # daily sales rollup here.
+        with transaction.atomic():
+            DailySales.objects.remove_invoices(self)
+            return super().delete()
+
+
 class Invoice(models.Model):
     created_by = models.ForeignKey(
         CustomUser,
@@ -145,17 +438,32 @@ class Invoice(models.Model):
     shop = models.ForeignKey(
         Shop, on_delete=models.SET_NULL, related_name="sale_shop", null=True
     )
+    search_document = models.TextField(default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = InvoiceQuerySet.as_manager()
+
+    SEARCH_FIELDS = ("shop__name", "created_by__email", "created_by__fullname")
+
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at", "id"], name="invoice_created_at_id"),
+            models.Index(fields=["shop", "created_at"], name="invoice_shop_created_at"),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = self.pk is not None
         action = f"added new invoice"
+        self.search_document = build_search_document(self, self.SEARCH_FIELDS)
         super().save(*args, **kwargs)
         add_user_Activity(self.created_by, action)
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            DailySales.objects.remove_invoices(Invoice.objects.filter(pk=self.pk))
+            return super().delete(*args, **kwargs)
+
 
 class InvoiceItem(models.Model):
     invoice = models.ForeignKey(
@@ -175,6 +483,12 @@ class InvoiceItem(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["created_at"], name="invoiceitem_created_at"),
+            models.Index(
+                fields=["item", "created_at"], name="invoiceitem_item_created_at"
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.item.remaining < self.quantity:
@@ -190,3 +504,225 @@ class InvoiceItem(models.Model):
 
     def __str__(self):
         return f"{self.item_code} - {self.quantity}"
+
+
+ImportJobStatus = (
+    ("pending", "pending"),
+    ("running", "running"),
+    ("completed", "completed"),
+    ("failed", "failed"),
+)
+
+
+class InventoryImportJob(models.Model):
+    created_by = models.ForeignKey(
+        CustomUser,
+        null=True,
+        related_name="inventory_import_jobs",
+        on_delete=models.SET_NULL,
+    )
+    file_path = models.CharField(max_length=500)
+    status = models.CharField(choices=ImportJobStatus, max_length=10, default="pending")
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    items_created = models.PositiveIntegerField(default=0)
+    items_updated = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=Q(status="pending"),
+                name="import_job_pending",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"import {self.id} - {self.status}"
+
+
+class DailySalesManager(models.Manager):
+    def record(self, shop_id, date, lines):
+        totals = {}
+        for item_id, quantity, amount in lines:
+            current = totals.get(item_id, (0, 0))
+            totals[item_id] = (current[0] + quantity, current[1] + amount)
+        if not totals:
+            return
+
+        # One upsert adds every line onto its (shop, item, date) row, so
+        # concurrent invoices for the same day never lose an increment.
+        values = []
+        for item_id, (quantity, amount) in totals.items():
+            values.extend([shop_id, item_id, date, quantity, amount])
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(totals))
+        self.upsert(f"VALUES {placeholders}", values)
+
+    # Sales of deleted shops or items are kept under a NULL shop/item. Their
+    # rows are folded into the NULL rows up front, since SET_NULL would
+    # collide with the unique (shop, item, date) index.
+    def detach(self, field, ids):
+        other = "item_id" if field == "shop" else "shop_id"
+        columns = {"shop_id": "NULL", "item_id": "NULL", other: other}
+        placeholders = ", ".join(["%s"] * len(ids))
+        self.upsert(
+            f"SELECT {columns['shop_id']}, {columns['item_id']}, date, "
+            f"SUM(quantity), SUM(amount) FROM {self.model._meta.db_table} "
+            f"WHERE {field}_id IN ({placeholders}) GROUP BY {other}, date",
+            ids,
+        )
+        self.filter(**{f"{field}_id__in": ids}).delete()
+
+    def upsert(self, rows, params):
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (shop_id, item_id, date, quantity, amount) "
+                f"{rows} "
+                # Matches the daily_sales_shop_item_date index, in which NULL
+                # shops and items are equal.
+                "ON CONFLICT (COALESCE(shop_id, 0), COALESCE(item_id, 0), date) "
+                "DO UPDATE SET "
+                f"quantity = {table}.quantity + excluded.quantity, "
+                f"amount = {table}.amount + excluded.amount",
+                params,
+            )
+
+    def remove_invoices(self, invoices):
+        lines = (
+            InvoiceItem.objects.filter(invoice__in=invoices)
+            .annotate(date=TruncDate("invoice__created_at"))
+            .values("invoice__shop_id", "date", "item_id")
+            .annotate(
+                total_quantity=Sum("quantity"),
+                total_amount=Sum(Coalesce("amount", 0.0)),
+            )
+        )
+        days = {}
+        for row in lines:
+            days.setdefault((row["invoice__shop_id"], row["date"]), []).append(
+                (row["item_id"], -row["total_quantity"], -row["total_amount"])
+            )
+        for (shop_id, date), day_lines in days.items():
+            self.record(shop_id, date, day_lines)
+
+    def rebuild(self, start_date=None, end_date=None):
+        lines = InvoiceItem.objects.annotate(date=TruncDate("invoice__created_at"))
+        rows = self.all()
+        if start_date:
+            lines = lines.filter(date__gte=start_date)
+            rows = rows.filter(date__gte=start_date)
+        if end_date:
+            lines = lines.filter(date__lte=end_date)
+            rows = rows.filter(date__lte=end_date)
+        totals = lines.values("invoice__shop_id", "item_id", "date").annotate(
+            total_quantity=Sum("quantity"),
+            total_amount=Sum(Coalesce("amount", 0.0)),
+        )
+        with transaction.atomic():
+            rows.delete()
+            created = self.bulk_create(
+                [
+                    self.model(
+                        shop_id=row["invoice__shop_id"],
+                        item_id=row["item_id"],
+                        date=row["date"],
+                        quantity=row["total_quantity"],
+                        amount=row["total_amount"],
+                    )
+                    for row in totals.iterator()
+                ],
+                batch_size=1000,
+            )
+        return len(created)
+
+
+class DailySales(models.Model):
+    shop = models.ForeignKey(
+        Shop, on_delete=models.SET_NULL, related_name="daily_sales", null=True
+    )
+    item = models.ForeignKey(
+        Inventory, on_delete=models.SET_NULL, related_name="daily_sales", null=True
+    )
+    date = models.DateField()
+    quantity = models.BigIntegerField(default=0)
+    amount = models.FloatField(default=0)
+
+    objects = DailySalesManager()
+
+    class Meta:
+        ordering = ("-date",)
+        constraints = [
+            models.UniqueConstraint(
+                Coalesce("shop", 0),
+                Coalesce("item", 0),
+                F("date"),
+                name="daily_sales_shop_item_date",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="daily_sales_date"),
+            models.Index(fields=["item", "date"], name="daily_sales_item_date"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.date} - {self.shop_id} - {self.item_id}"
+
+
+class DashboardCounterManager(models.Manager):
+    def adjust(self, name, delta):
+        if not delta:
+            return
+        # Applied inside the writing transaction, so the change and its
+        # counted rows commit together and reconcile() (which takes the same
+        # row lock) sees either both or neither.
+        self.filter(name=name).update(
+            value=F("value") + delta, updated_at=timezone.now()
+        )
+
+    def snapshot(self):
+        values = dict(self.values_list("name", "value"))
+        missing = [name for name in DASHBOARD_COUNTERS if name not in values]
+        if missing:
+            values.update(self.reconcile(missing))
+        return {name: values[name] for name in DASHBOARD_COUNTERS}
+
+    def reconcile(self, names=None):
+        names = names or list(DASHBOARD_COUNTERS)
+        values = {}
+        with transaction.atomic():
+            # Writers hold the counter row lock from their adjustment until
+            # they commit, so once the locks are held every counted change is
+            # either committed (and in the count) or will adjust afterwards.
+            list(self.select_for_update().filter(name__in=names))
+            for name in names:
+                values[name] = DASHBOARD_COUNTERS[name]().count()
+                self.update_or_create(name=name, defaults={"value": values[name]})
+        return values
+
+
+class DashboardCounter(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DashboardCounterManager()
+
+    def __str__(self) -> str:
+        return f"{self.name} - {self.value}"
+
+
+# The querysets each dashboard counter tracks, used to seed and reconcile them.
+DASHBOARD_COUNTERS = {
+    "total_inventory": lambda: Inventory.objects.filter(remaining__gt=0),
+    "total_groups": lambda: InventoryGroup.objects.all(),
+    "total_shops": lambda: Shop.objects.all(),
+    "total_users": lambda: CustomUser.objects.filter(is_superuser=False),
+}
@@ -0,0 +1,179 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import threading
+import uuid
+from urllib.parse import unquote_to_bytes
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are skipped when Pillow is not installed.
+    Image = None
+
+
+DEFAULT_PHOTO_STORE = {
+    "BACKEND": "local",
+    "DIR": "photos",
+    "PREFIX": "photos",
+    "MAX_SIZE": 5 * 1024 * 1024,
+    "THUMBNAIL_SIZE": (200, 200),
+}
+THUMBNAIL_SUFFIX = ".thumb"
+THUMBNAIL_CONTENT_TYPE = "image/jpeg"
+# Photos are served without authentication, so only raster formats are
+# stored, with the content type taken from the decoded image rather than
+# from the client (an SVG could carry script).
+IMAGE_CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+
+class LocalPhotoBackend:
+    def __init__(self, directory):
+        self.directory = str(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def save(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as destination:
+            destination.write(data)
+        os.replace(tmp_path, path)
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+
+class StoragePhotoBackend:
+    # Stands in for an object store through Django's storage API, so any
+    # configured storage (e.g. S3 from django-storages) can hold the blobs.
+    def __init__(self, storage, prefix):
+        self.storage = storage
+        self.prefix = prefix
+
+    def name(self, key):
+        return f"{self.prefix}/{key[:2]}/{key}"
+
+    def exists(self, key):
+        return self.storage.exists(self.name(key))
+
+    def save(self, key, data):
+        if not self.exists(key):
+            self.storage.save(self.name(key), ContentFile(data))
+
+    def open(self, key):
+        return self.storage.open(self.name(key), "rb")
+
+
+# Photos are stored once under the sha256 of their bytes, with a JPEG
+# thumbnail generated next to them when they are first stored.
+class PhotoStore:
+    def __init__(self, backend, max_size, thumbnail_size):
+        self.backend = backend
+        self.max_size = max_size
+        self.thumbnail_size = thumbnail_size
+
+    def save(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.backend.exists(digest):
+            self.backend.save(digest, data)
+
+        has_thumbnail = self.backend.exists(digest + THUMBNAIL_SUFFIX)
+        if not has_thumbnail:
+            thumbnail = self.make_thumbnail(data)
+            if thumbnail is not None:
+                self.backend.save(digest + THUMBNAIL_SUFFIX, thumbnail)
+                has_thumbnail = True
+        return digest, has_thumbnail
+
+    def open(self, digest, thumbnail=False):
+        return self.backend.open(digest + THUMBNAIL_SUFFIX if thumbnail else digest)
+
+    def make_thumbnail(self, data):
+        if Image is None:
+            return None
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.thumbnail(self.thumbnail_size)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=85)
+        except Exception:
+            return None
+        return output.getvalue()
+
+    def image_content_type(self, data):
+        if Image is None:
+            raise Exception("photos can't be verified without Pillow")
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.verify()
+        except Exception:
+            raise Exception("photo is not a valid image")
+        if image.format not in IMAGE_CONTENT_TYPES:
+            raise Exception(f"photo format '{image.format}' is not supported")
+        return IMAGE_CONTENT_TYPES[image.format]
+
+    def decode_data_uri(self, value):
+        header, separator, payload = value.partition(",")
+        if not header.startswith("data:") or not separator:
+            raise Exception("photo must be a data URI")
+        content_type = header[5:].split(";")[0] or "application/octet-stream"
+        if not content_type.startswith("image/"):
+            raise Exception(f"photo content type '{content_type}' is not an image")
+
+        if header.endswith(";base64"):
+            if len(payload) * 3 // 4 > self.max_size:
+                raise Exception(f"photo is larger than {self.max_size} bytes")
+            try:
+                data = base64.b64decode(payload, validate=True)
+            except (binascii.Error, ValueError):
+                raise Exception("photo is not valid base64")
+        else:
+            data = unquote_to_bytes(payload)
+        if len(data) > self.max_size:
+            raise Exception(f"photo is larger than {self.max_size} bytes")
+        return data, self.image_content_type(data)
+
+
+def build_photo_store():
+    config = {
+        **DEFAULT_PHOTO_STORE,
+        **getattr(settings, "PHOTO_STORE", {}),
+    }
+    if config["BACKEND"] == "storage":
+        backend = StoragePhotoBackend(default_storage, config["PREFIX"])
+    elif config["BACKEND"] == "local":
+        backend = LocalPhotoBackend(config["DIR"])
+    else:
+        raise ValueError(f"Unknown photo store backend '{config['BACKEND']}'")
+    return PhotoStore(backend, config["MAX_SIZE"], config["THUMBNAIL_SIZE"])
+
+
+_photo_store = None
+_photo_store_lock = threading.Lock()
+
+
+def get_photo_store():
+    global _photo_store
+    if _photo_store is None:
+        with _photo_store_lock:
+            if _photo_store is None:
+                _photo_store = build_photo_store()
+    return _photo_store
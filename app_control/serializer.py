@@ -1,36 +1,154 @@
-from .models import Inventory, InventoryGroup, Shop, Invoice, InvoiceItem
+import re
+from urllib.parse import urlparse
+
+from .models import (
+    Inventory,
+    InventoryGroup,
+    InventoryImportJob,
+    PhotoBlob,
+    Shop,
+    Invoice,
+    InvoiceItem,
+)
+from .invoicing import create_invoice
 from user_control.serializer import CustomUserSerializer, serializers
+from django.db import models
+from django.urls import Resolver404, resolve, reverse
+from inventory_api.sparse import SparseFieldsMixin
+
+
+class GroupAncestorsListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.Manager) else data
+        items = list(items)
+        # Groups loaded by an enclosing list (e.g. the invoices of a page)
+        # already have their ancestors.
+        InventoryGroup.objects.load_ancestors(
+            [
+                group
+                for group in self.child.get_groups(items)
+                if group is not None and not hasattr(group, "ancestors")
+            ]
+        )
+        return super().to_representation(items)
 
 
-class InventoryGroupSerializer(serializers.ModelSerializer):
+class InventoryGroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = CustomUserSerializer(read_only=True)
     created_by_id = serializers.CharField(write_only=True, required=False)
     belongs_to = serializers.SerializerMethodField(read_only=True)
     belongs_to_id = serializers.CharField(write_only=True, required=False)
+    ancestors = serializers.SerializerMethodField(read_only=True)
     total_items = serializers.CharField(read_only=True, required=False)
+    subtree_items = serializers.IntegerField(read_only=True, required=False)
 
     class Meta:
         model = InventoryGroup
         fields = "__all__"
+        list_serializer_class = GroupAncestorsListSerializer
+
+    expandable_fields = ("created_by",)
+    field_columns = {
+        "belongs_to": ("belongs_to", "path"),
+        "ancestors": ("belongs_to", "path"),
+    }
+
+    def get_groups(self, items):
+        return items
+
+    def get_ancestor_list(self, obj):
+        if not hasattr(obj, "ancestors"):
+            InventoryGroup.objects.load_ancestors([obj])
+        return [{"id": id, "name": name} for id, name in obj.ancestors]
 
     def get_belongs_to(self, obj):
-        if obj.belongs_to is not None:
-            return InventoryGroupSerializer(obj.belongs_to).data
+        if obj.belongs_to_id is None:
+            return None
+        return self.get_ancestor_list(obj)[-1]
+
+    def get_ancestors(self, obj):
+        return self.get_ancestor_list(obj)
+
+
+PHOTO_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def photo_url(digest, thumbnail=False):
+    url = reverse("photos-detail", args=[digest])
+    return f"{url}?size=thumbnail" if thumbnail else url
+
+
+class PhotoField(serializers.Field):
+    # Reads as the photo's URL. Accepts a data URI (moved into the photo
+    # store on save), the id or URL of an uploaded photo, or an external URL.
+    value_columns = ("photo", "photo_blob")
+
+    def __init__(self, thumbnail=False, **kwargs):
+        self.thumbnail = thumbnail
+        kwargs.update(source="*", required=False, allow_null=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, item):
+        return self.represent_values(item.photo, item.photo_blob_id)
+
+    def represent_values(self, photo, photo_blob_id):
+        if photo_blob_id:
+            return photo_url(photo_blob_id, thumbnail=self.thumbnail)
+        return photo
+
+    def to_internal_value(self, value):
+        if not value:
+            return {"photo": None, "photo_blob_id": None}
+        if not isinstance(value, str):
+            raise serializers.ValidationError("Expected a photo URL or data URI")
+        digest = self.parse_digest(value)
+        if digest is not None and PhotoBlob.objects.filter(digest=digest).exists():
+            return {"photo": None, "photo_blob_id": digest}
+        return {"photo": value, "photo_blob_id": None}
+
+    def parse_digest(self, value):
+        if value.startswith("data:"):
+            return None
+        if PHOTO_DIGEST.fullmatch(value):
+            return value
+        # A URL rendered by this field, e.g. sent back unchanged in a PUT.
+        try:
+            match = resolve(urlparse(value).path)
+        except Resolver404:
+            return None
+        digest = match.kwargs.get("pk", "")
+        if match.url_name == "photos-detail" and PHOTO_DIGEST.fullmatch(digest):
+            return digest
         return None
 
+    def validate_empty_values(self, data):
+        if data is None:
+            return True, {"photo": None, "photo_blob_id": None}
+        return super().validate_empty_values(data)
+
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = CustomUserSerializer(read_only=True)
     created_by_id = serializers.CharField(write_only=True, required=False)
     group = InventoryGroupSerializer(read_only=True)
     group_id = serializers.CharField(write_only=True)
+    photo = PhotoField()
+    photo_thumbnail = PhotoField(thumbnail=True, read_only=True)
 
     class Meta:
         model = Inventory
-        fields = "__all__"
+        exclude = ("search_document", "photo_blob")
+        list_serializer_class = GroupAncestorsListSerializer
+
+    expandable_fields = ("created_by", "group")
+
+    def get_groups(self, items):
+        if not self.is_expanded("group"):
+            return []
+        return [item.group for item in items]
 
 
-class ShopSerializer(serializers.ModelSerializer):
+class ShopSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = CustomUserSerializer(read_only=True)
     created_by_id = serializers.CharField(write_only=True, required=False)
     amount_total = serializers.CharField(read_only=True, required=False)
@@ -38,20 +156,21 @@ class ShopSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Shop
-        fields = "__all__"
+        exclude = ("search_document",)
+
+    expandable_fields = ("created_by",)
 
 
 class ShopWithAmountSerializer(ShopSerializer):
     amount_total = serializers.FloatField()
-    month = serializers.CharField(required=False)
 
 
 class InvoiceItemDataSerializer(serializers.Serializer):
-    item_id = serializers.CharField()
-    quantity = serializers.IntegerField()
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
 
 
-class InvoiceItemSerializer(serializers.ModelSerializer):
+class InvoiceItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     invoice = serializers.CharField(read_only=True)
     invoice_id = serializers.CharField(write_only=True)
     item = InventorySerializer(read_only=True)
@@ -60,9 +179,19 @@ class InvoiceItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = InvoiceItem
         fields = "__all__"
+        list_serializer_class = GroupAncestorsListSerializer
+
+    expandable_fields = ("item",)
+
+    def get_groups(self, items):
+        if not self.is_expanded("item"):
+            return []
+        return self.fields["item"].get_groups(
+            [line.item for line in items if line.item is not None]
+        )
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = CustomUserSerializer(read_only=True)
     created_by_id = serializers.CharField(write_only=True, required=False)
     shop = ShopSerializer(read_only=True)
@@ -72,28 +201,58 @@ class InvoiceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Invoice
-        fields = "__all__"
+        exclude = ("search_document",)
+        list_serializer_class = GroupAncestorsListSerializer
+
+    expandable_fields = ("created_by", "shop")
+
+    def get_groups(self, invoices):
+        if "invoice_items" not in self.fields:
+            return []
+        return self.fields["invoice_items"].child.get_groups(
+            [line for invoice in invoices for line in invoice.invoice_items.all()]
+        )
 
     def create(self, validated_data):
         invoice_item_data = validated_data.pop("invoice_item_data")
         if not invoice_item_data:
             raise Exception("You need to provide at least one invoice item")
 
-        invoice = super().create(validated_data)
+        return create_invoice(validated_data, invoice_item_data)
+
+
+class InventoryWithSum(InventorySerializer):
+    sum_of_items = serializers.IntegerField()
 
-        invoice_item_serializer = InvoiceItemSerializer(
-            data=[{"invoice_id": invoice.id, **item} for item in invoice_item_data],
-            many=True,
-        )
 
-        if invoice_item_serializer.is_valid():
-            invoice_item_serializer.save()
-        else:
-            invoice.delete()
-            raise Exception(invoice_item_serializer.errors)
+class InventoryImportJobSerializer(serializers.ModelSerializer):
+    rows_per_second = serializers.SerializerMethodField(read_only=True)
 
-        return invoice
+    class Meta:
+        model = InventoryImportJob
+        exclude = ("file_path",)
 
+    def get_rows_per_second(self, obj):
+        if obj.started_at is None:
+            return None
+        finished_at = obj.finished_at or obj.updated_at
+        elapsed = (finished_at - obj.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(obj.rows_processed / elapsed, 2)
 
-class InventoryWithSum(InventorySerializer):
-    sum_of_items = serializers.IntegerField()
+
+class PhotoBlobSerializer(serializers.ModelSerializer):
+    id = serializers.CharField(source="digest", read_only=True)
+    url = serializers.SerializerMethodField(read_only=True)
+    thumbnail_url = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = PhotoBlob
+        exclude = ("digest",)
+
+    def get_url(self, obj):
+        return photo_url(obj.digest)
+
+    def get_thumbnail_url(self, obj):
+        return photo_url(obj.digest, thumbnail=obj.has_thumbnail)
@@ -0,0 +1,104 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from inventory_api.response_cache import get_response_cache
+from inventory_api.search import refresh_search_documents
+from user_control.models import CustomUser
+from .models import (
+    DailySales,
+    DashboardCounter,
+    Inventory,
+    InventoryGroup,
+    Invoice,
+    InvoiceItem,
+    Shop,
+)
+
+SEARCHABLE_MODELS = (Inventory, Shop, Invoice)
+COUNTED_MODELS = {InventoryGroup: "total_groups", Shop: "total_shops"}
+# Models whose rows feed the cached analytics responses.
+ANALYTICS_MODELS = (Invoice, InvoiceItem, Inventory, InventoryGroup, Shop)
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_user_search_documents(sender, instance, created, **kwargs):
+    if created or not instance.identity_changed:
+        return
+    for model in SEARCHABLE_MODELS:
+        refresh_search_documents(model.objects.filter(created_by_id=instance.pk))
+
+
+@receiver(post_delete, sender=CustomUser)
+def clear_user_search_documents(sender, instance, **kwargs):
+    for model in SEARCHABLE_MODELS:
+        refresh_search_documents(
+            model.objects.filter(
+                created_by__isnull=True,
+                search_document__contains=instance.email.lower(),
+            )
+        )
+
+
+@receiver(post_save, sender=CustomUser)
+def count_saved_user(sender, instance, created, **kwargs):
+    # None when is_superuser was deferred: whether it changed is unknown.
+    if not created and instance.old_is_superuser is None:
+        return
+    was_counted = not created and instance.old_is_superuser is False
+    DashboardCounter.objects.adjust(
+        "total_users", int(not instance.is_superuser) - int(was_counted)
+    )
+
+
+@receiver(post_delete, sender=CustomUser)
+def count_deleted_user(sender, instance, **kwargs):
+    if not instance.is_superuser:
+        DashboardCounter.objects.adjust("total_users", -1)
+
+
+@receiver(post_save, sender=Inventory)
+def count_saved_item(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "remaining" not in update_fields:
+        return
+    was_in_stock = not created and (instance.old_remaining or 0) > 0
+    DashboardCounter.objects.adjust(
+        "total_inventory", int(instance.in_stock) - int(was_in_stock)
+    )
+
+
+@receiver(post_delete, sender=Inventory)
+def count_deleted_item(sender, instance, **kwargs):
+    if instance.in_stock:
+        DashboardCounter.objects.adjust("total_inventory", -1)
+
+
+@receiver(post_save, sender=InventoryGroup)
+@receiver(post_save, sender=Shop)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        DashboardCounter.objects.adjust(COUNTED_MODELS[sender], 1)
+
+
+@receiver(post_delete, sender=InventoryGroup)
+@receiver(post_delete, sender=Shop)
+def count_deleted(sender, instance, **kwargs):
+    DashboardCounter.objects.adjust(COUNTED_MODELS[sender], -1)
+
+
+@receiver(pre_delete, sender=Shop)
+def detach_shop_sales(sender, instance, **kwargs):
+    DailySales.objects.detach("shop", [instance.pk])
+
+
+@receiver(pre_delete, sender=Inventory)
+def detach_item_sales(sender, instance, **kwargs):
+    DailySales.objects.detach("item", [instance.pk])
+
+
+def invalidate_analytics(sender, **kwargs):
+    get_response_cache().invalidate()
+
+
+for model in ANALYTICS_MODELS:
+    post_save.connect(invalidate_analytics, sender=model)
+    post_delete.connect(invalidate_analytics, sender=model)
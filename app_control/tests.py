@@ -1,3 +1,502 @@
+import base64
+import io
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+
+from inventory_api.principal_cache import get_principal_cache
+from inventory_api.response_cache import get_response_cache
+from inventory_api.utils import get_access_token
+from user_control.models import CustomUser
+from .csv_import import InventoryCSVImporter
+from .serializer import InventorySerializer
+from .models import (
+    DASHBOARD_COUNTERS,
+    DailySales,
+    DashboardCounter,
+    Inventory,
+    InventoryGroup,
+    Invoice,
+    InvoiceItem,
+    PhotoBlob,
+    Shop,
+)
+
+
+class InventoryIdTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="creator@example.com", fullname="Creator", role="admin"
+        )
+
+    def new_items(self, count):
+        return [
+            Inventory(created_by=self.user, name=f"Item {n}", total=5, price=1)
+            for n in range(count)
+        ]
+
+    def test_codes_are_unique_across_batches(self):
+        items = Inventory.objects.bulk_create(self.new_items(3))
+        items.append(
+            Inventory.objects.create(
+                created_by=self.user, name="Saved item", total=5, price=1
+            )
+        )
+        items += Inventory.objects.bulk_create(self.new_items(3))
+
+        ids = [item.id for item in items]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(
+            set(Inventory.objects.values_list("code", flat=True)),
+            {f"ITEM{item_id:06d}" for item_id in ids},
+        )
+
+    def test_allocations_do_not_overlap_before_insert(self):
+        first = Inventory.objects.allocate_ids(3)
+        second = Inventory.objects.allocate_ids(2)
+        self.assertEqual(len(set(first + second)), 5)
+        self.assertLess(max(first), min(second))
+
+    def test_deleted_ids_are_not_reused(self):
+        (item,) = Inventory.objects.bulk_create(self.new_items(1))
+        Inventory.objects.filter(id=item.id).delete()
+        (new_item,) = Inventory.objects.bulk_create(self.new_items(1))
+        self.assertGreater(new_item.id, item.id)
+
+    @skipUnless(
+        connection.vendor == "postgresql",
+        "SQLite reservations are undone by the rollback",
+    )
+    def test_rolled_back_allocation_is_not_reused(self):
+        try:
+            with transaction.atomic():
+                rolled_back = Inventory.objects.bulk_create(self.new_items(3))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        items = Inventory.objects.bulk_create(self.new_items(3))
+        self.assertFalse(
+            {item.id for item in items} & {item.id for item in rolled_back}
+        )
+        self.assertEqual(Inventory.objects.count(), 3)
+
+
+class SalesTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="seller@example.com", fullname="Seller", role="admin"
+        )
+        self.user.shop_id = Shop.objects.create(created_by=self.user, name="Shop").id
+        self.user.save()
+        self.auth = {
+            "HTTP_AUTHORIZATION": "Bearer "
+            + get_access_token({"user_id": str(self.user.id)}, 1)
+        }
+        self.group = InventoryGroup.objects.create(created_by=self.user, name="Group")
+        self.item = self.new_item(5)
+        self.other = self.new_item(2)
+
+    def new_item(self, total, group=None):
+        return Inventory.objects.create(
+            created_by=self.user,
+            name="Item",
+            total=total,
+            price=2,
+            group=group or self.group,
+        )
+
+    def create_invoice(self, *lines):
+        return self.client.post(
+            "/api/v1/app/invoice",
+            {
+                "invoice_item_data": [
+                    {"item_id": item.id, "quantity": quantity}
+                    for item, quantity in lines
+                ]
+            },
+            content_type="application/json",
+            **self.auth,
+        )
+
+    def remaining(self, item):
+        item.refresh_from_db()
+        return item.remaining
+
+
+class InvoiceCreateTests(SalesTestCase):
+    def test_duplicate_item_lines_take_their_total(self):
+        response = self.create_invoice((self.item, 2), (self.item, 3))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(line["quantity"] for line in response.json()["invoice_items"]),
+            [2, 3],
+        )
+        self.assertEqual(self.remaining(self.item), 0)
+
+    def test_insufficient_stock_changes_nothing(self):
+        response = self.create_invoice((self.item, 2), (self.other, 1), (self.other, 2))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn(self.other.code, response.json()["error"])
+        self.assertEqual(self.remaining(self.item), 5)
+        self.assertEqual(self.remaining(self.other), 2)
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_failure_after_stock_update_rolls_back(self):
+        with mock.patch.object(
+            DailySales.objects, "record", side_effect=RuntimeError("failed")
+        ):
+            response = self.create_invoice((self.item, 2))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.remaining(self.item), 5)
+        self.assertFalse(Invoice.objects.exists())
+        self.assertFalse(InvoiceItem.objects.exists())
+
+    def test_counters_follow_invoices(self):
+        def counters():
+            snapshot = DashboardCounter.objects.snapshot()
+            self.assertEqual(
+                snapshot,
+                {name: rows().count() for name, rows in DASHBOARD_COUNTERS.items()},
+            )
+            return snapshot
+
+        DashboardCounter.objects.reconcile()
+        before = counters()
+        response = self.create_invoice((self.other, 2), (self.item, 1))
+        self.assertEqual(response.status_code, 201)
+        after_sale = counters()
+        self.assertEqual(after_sale["total_inventory"], before["total_inventory"] - 1)
+
+        response = self.client.delete(
+            f"/api/v1/app/invoice/{response.json()['id']}", **self.auth
+        )
+        self.assertEqual(response.status_code, 204)
+        # Deleting an invoice doesn't restock its items.
+        self.assertEqual(counters(), after_sale)
+
+    def test_rebuilding_daily_sales_is_idempotent(self):
+        def rollup():
+            return set(DailySales.objects.values_list("shop_id", "item_id", "quantity"))
+
+        third = self.new_item(5)
+        self.create_invoice((self.item, 2), (self.other, 1))
+        self.create_invoice((self.item, 1), (third, 2))
+        # Sales of deleted items are merged under a NULL item.
+        self.other.delete()
+        third.delete()
+        recorded = rollup()
+        self.assertEqual(
+            recorded,
+            {(self.user.shop_id, None, 3), (self.user.shop_id, self.item.id, 3)},
+        )
+
+        for _ in range(2):
+            call_command("rebuild_daily_sales", stdout=StringIO())
+            self.assertEqual(rollup(), recorded)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        def count_queries(size):
+            items = [
+                self.new_item(
+                    5,
+                    InventoryGroup.objects.create(
+                        created_by=self.user,
+                        name=f"Child {size}-{n}",
+                        belongs_to=self.group,
+                    ),
+                )
+                for n in range(size)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.create_invoice(*[(item, 1) for item in items])
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()["invoice_items"]), size)
+            return len(queries)
+
+        count_queries(1)
+        self.assertEqual(count_queries(2), count_queries(12))
+
+
+def photo_bytes(color):
+    image = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(image, "PNG")
+    return image.getvalue()
+
+
+def photo_data_uri(color):
+    return "data:image/png;base64," + base64.b64encode(photo_bytes(color)).decode()
+
+
+def use_temporary_photo_store(test):
+    photo_dir = tempfile.TemporaryDirectory()
+    test.addCleanup(photo_dir.cleanup)
+    photo_settings = override_settings(PHOTO_STORE={"DIR": photo_dir.name})
+    photo_settings.enable()
+    test.addCleanup(photo_settings.disable)
+    # Build a photo store for the temporary directory.
+    photo_store = mock.patch("app_control.photos._photo_store", None)
+    photo_store.start()
+    test.addCleanup(photo_store.stop)
+    return photo_dir.name
+
+
+class CSVImportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="importer@example.com", fullname="Importer", role="admin"
+        )
+        self.group = InventoryGroup.objects.create(created_by=self.user, name="Group")
+        self.photo_dir = use_temporary_photo_store(self)
+
+    def import_rows(self, *rows):
+        lines = ["group_id,total,name,price,photo"]
+        lines += [",".join(f'"{value}"' for value in row) for row in rows]
+        importer = InventoryCSVImporter(self.user)
+        return importer.run([f"{line}\n".encode() for line in lines])
+
+    def stored(self):
+        return [name for _, _, names in os.walk(self.photo_dir) for name in names]
+
+    def test_invalid_rows_are_reported_in_file_order(self):
+        report = self.import_rows(
+            (self.group.id, 5, "First", 1),
+            (self.group.id + 100, 5, "Missing group", 1),
+            (self.group.id, -1, "Negative", 1),
+            (self.group.id, 5, "Last", 1),
+        )
+        self.assertEqual((report["created"], report["failed"]), (2, 2))
+        self.assertEqual([error["row"] for error in report["errors"]], [3, 4])
+        self.assertIn("group_id", report["errors"][0]["errors"])
+        self.assertIn("total", report["errors"][1]["errors"])
+        self.assertEqual(
+            set(Inventory.objects.values_list("name", flat=True)), {"First", "Last"}
+        )
+
+    def test_existing_items_are_incremented(self):
+        item = Inventory.objects.create(
+            created_by=self.user, name="Widget", total=5, price=1, group=self.group
+        )
+        report = self.import_rows(
+            (self.group.id, 3, "Widget", 2), (self.group.id, 2, "Widget", 4)
+        )
+        self.assertEqual((report["created"], report["updated"]), (0, 1))
+        item.refresh_from_db()
+        self.assertEqual((item.total, item.remaining, item.price), (10, 10, 4))
+
+    def test_database_error_fails_only_its_row(self):
+        Inventory.objects.create(
+            created_by=self.user, name="Widget", total=5, price=1, group=self.group
+        )
+        bulk_create = Inventory.objects.bulk_create
+
+        def reject_bad_rows(objs, *args, **kwargs):
+            objs = list(objs)
+            if any(obj.name == "Bad" for obj in objs):
+                raise IntegrityError("bad row")
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(
+            Inventory.objects, "bulk_create", side_effect=reject_bad_rows
+        ):
+            report = self.import_rows(
+                (self.group.id, 5, "Good", 1, photo_data_uri("red")),
+                (self.group.id, 5, "Bad", 1, photo_data_uri("blue")),
+                (self.group.id, 5, "Widget", 1),
+            )
+
+        self.assertEqual(
+            (report["created"], report["updated"], report["failed"]), (1, 1, 1)
+        )
+        self.assertEqual(
+            report["errors"], [{"row": 3, "errors": {"non_field_errors": ["bad row"]}}]
+        )
+        self.assertFalse(Inventory.objects.filter(name="Bad").exists())
+        self.assertEqual(Inventory.objects.get(name="Widget").remaining, 10)
+
+        # Only the written row's photo was stored.
+        (blob,) = PhotoBlob.objects.all()
+        self.assertEqual(Inventory.objects.get(name="Good").photo_blob, blob)
+        self.assertTrue(all(name.startswith(blob.digest) for name in self.stored()))
+
+
+class GroupPathTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="groups@example.com", fullname="Groups", role="admin"
+        )
+        self.root = self.new_group("Root")
+        self.child = self.new_group("Child", self.root)
+        self.leaf = self.new_group("Leaf", self.child)
+        self.other = self.new_group("Other")
+
+    def new_group(self, name, belongs_to=None):
+        return InventoryGroup.objects.create(
+            created_by=self.user, name=name, belongs_to=belongs_to
+        )
+
+    def paths(self):
+        return dict(InventoryGroup.objects.values_list("name", "path"))
+
+    def rebuild_paths(self):
+        out = StringIO()
+        call_command("rebuild_paths", stdout=out)
+        return out.getvalue().strip()
+
+    def test_moving_a_group_moves_its_subtree(self):
+        self.child.belongs_to = self.other
+        self.child.save()
+        self.assertEqual(self.paths()["Leaf"], f"/{self.other.id}/{self.child.id}/")
+        self.assertEqual(self.rebuild_paths(), "Corrected 0 group path(s)")
+
+    def test_deleting_a_group_promotes_its_children(self):
+        self.root.delete()
+        self.assertEqual(
+            self.paths(), {"Child": "/", "Leaf": f"/{self.child.id}/", "Other": "/"}
+        )
+        self.assertEqual(self.rebuild_paths(), "Corrected 0 group path(s)")
+
+    def test_rebuild_repairs_queryset_moves_and_deletes(self):
+        InventoryGroup.objects.filter(id=self.child.id).update(belongs_to=self.other)
+        InventoryGroup.objects.filter(id=self.root.id).delete()
+        InventoryGroup.objects.bulk_create(
+            [InventoryGroup(name="Bulk", belongs_to=self.leaf)]
+        )
+
+        self.assertEqual(self.rebuild_paths(), "Corrected 3 group path(s)")
+        self.assertEqual(
+            self.paths(),
+            {
+                "Child": f"/{self.other.id}/",
+                "Leaf": f"/{self.other.id}/{self.child.id}/",
+                "Bulk": f"/{self.other.id}/{self.child.id}/{self.leaf.id}/",
+                "Other": "/",
+            },
+        )
+        self.assertEqual(self.rebuild_paths(), "Corrected 0 group path(s)")
+
+
+class ExplainEndpointsTests(TestCase):
+    def test_audit_bypasses_the_response_cache(self):
+        CustomUser.objects.create(
+            email="audit@example.com", fullname="Audit", role="admin", is_superuser=True
+        )
+        get_response_cache().clear()
+        get_principal_cache().clear()
+
+        counts = []
+        for _ in range(2):
+            out = StringIO()
+            call_command(
+                "explain_endpoints",
+                endpoint="top_selling",
+                planner_defaults=True,
+                stdout=out,
+            )
+            counts.append(int(out.getvalue().split(": ")[1].split()[0]))
+        # The second run only skips loading the user, which is cached.
+        self.assertEqual(counts[1], counts[0] - 1)
+        self.assertEqual(get_response_cache().stats()["size"], 0)
+
+
+class ConditionalGetTests(SalesTestCase):
+    def get(self, path, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(path, **self.auth, **headers)
+
+    def assert_changes(self, path, change):
+        response = self.get(path)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.get(path, etag).status_code, 304)
+        change()
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response.json()["results"]
+
+    def test_group_list_notices_deleted_items(self):
+        # Not the most recently updated item, so MAX(updated_at) is the same.
+        (group,) = self.assert_changes("/api/v1/app/groups", self.item.delete)
+        self.assertEqual(group["total_items"], "1")
+
+    def test_invoice_list_notices_deleted_items(self):
+        self.create_invoice((self.item, 1), (self.other, 1))
+        (invoice,) = self.assert_changes("/api/v1/app/invoice", self.other.delete)
+        self.assertEqual(
+            sorted(line["item"] is None for line in invoice["invoice_items"]),
+            [False, True],
+        )
+
+    def test_changed_row_is_rendered(self):
+        def rename():
+            self.group.name = "Renamed"
+            self.group.save()
+
+        (group,) = self.assert_changes("/api/v1/app/groups", rename)
+        self.assertEqual(group["name"], "Renamed")
+
+
+class PhotoFieldTests(SalesTestCase):
+    def setUp(self):
+        super().setUp()
+        use_temporary_photo_store(self)
+        self.blob = PhotoBlob.objects.store(photo_bytes("green"), "image/png")
+        self.item.photo_blob = self.blob
+        self.item.save()
+
+    def put_photo(self, photo):
+        path = f"/api/v1/app/inventory/{self.item.id}"
+        data = self.client.get(path, **self.auth).json()
+        response = self.client.put(
+            path,
+            {
+                "name": data["name"],
+                "total": data["total"],
+                "price": data["price"],
+                "group_id": self.group.id,
+                "photo": photo(data),
+            },
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.item.refresh_from_db()
+        return response.json()
+
+    def test_rendered_urls_and_digests_keep_the_photo(self):
+        for photo in (
+            lambda data: data["photo"],
+            lambda data: "http://testserver" + data["photo"],
+            lambda data: data["photo_thumbnail"],
+            lambda data: self.blob.digest,
+        ):
+            data = self.put_photo(photo)
+            self.assertEqual(self.item.photo_blob_id, self.blob.digest)
+            self.assertIsNone(self.item.photo)
+            self.assertTrue(data["photo"].endswith(f"/photos/{self.blob.digest}"))
+
+    def test_other_values_are_not_looked_up(self):
+        field = InventorySerializer().fields["photo"]
+        with self.assertNumQueries(0):
+            for value in (
+                photo_data_uri("red"),
+                "https://example.com/photo.png",
+                "/api/v1/app/photos/not-a-digest",
+                f"/api/v1/app/inventory/{self.blob.digest}",
+            ):
+                self.assertEqual(
+                    field.to_internal_value(value),
+                    {"photo": value, "photo_blob_id": None},
+                )
 
-# Create your tests here.
+        self.put_photo(lambda data: "https://example.com/photo.png")
+        self.assertIsNone(self.item.photo_blob_id)
+        self.assertEqual(self.item.photo, "https://example.com/photo.png")
@@ -7,8 +7,10 @@ from .views import (
     PurchaseView,
     InventoryGroupView,
     SalesPerformanceView,
+    SalesSeriesView,
     InvoiceView,
     InventoryCSVLoaderView,
+    PhotoView,
 )
 from rest_framework.routers import DefaultRouter
 
@@ -21,8 +23,10 @@ router.register("summary", SummaryView, "summary")
 router.register("purchase_summary", PurchaseView, "purchase_summary")
 router.register("sales_by_shop", SaleByShopView, "sales_by_shop")
 router.register("top_selling", SalesPerformanceView, "top_selling")
+router.register("sales_series", SalesSeriesView, "sales_series")
 router.register("invoice", InvoiceView, "invoice")
 router.register("groups", InventoryGroupView, "groups")
+router.register("photos", PhotoView, "photos")
 
 
 urlpatterns = [path("app/", include(router.urls))]
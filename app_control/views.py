@@ -1,10 +1,23 @@
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import NotFound
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import status
-from .models import InvoiceItem
-
+from rest_framework import serializers, status
+from .models import DailySales, DashboardCounter, PhotoBlob
+from .csv_import import InventoryCSVImporter
+from .import_jobs import submit_import_job
+from .analytics import filter_sales_dates, sales_series
+from .photos import IMAGE_CONTENT_TYPES, THUMBNAIL_CONTENT_TYPE, get_photo_store
+
+from inventory_api.conditional import ConditionalGetMixin
 from inventory_api.custom_methods import IsAuthenticatedCustom
-from user_control.models import CustomUser
-from inventory_api.utils import CustomPagination, get_query
+from inventory_api.export import ExportMixin
+from inventory_api.fast_read import FastReadMixin, serialize_many
+from inventory_api.utils import CustomPagination
+from inventory_api.search import search
+from inventory_api.sparse import SparseQuerysetMixin
+from inventory_api.filters import FilterField, QueryFilter, RANGE_LOOKUPS
+from inventory_api.response_cache import cached_response
 from .serializer import (
     InventoryGroupSerializer,
     Inventory,
@@ -16,18 +29,49 @@ from .serializer import (
     Invoice,
     InvoiceSerializer,
     ShopWithAmountSerializer,
+    InventoryImportJob,
+    InventoryImportJobSerializer,
+    PhotoBlobSerializer,
 )
 from rest_framework.response import Response
-from django.db.models import Count, functions, Sum, F
-import codecs
-import csv
+from django.db.models import (
+    Count,
+    Max,
+    OuterRef,
+    Subquery,
+    Sum,
+    functions,
+)
 
 
-class InventoryView(ModelViewSet):
-    queryset = Inventory.objects.select_related("group", "created_by")
+class InventoryView(
+    ExportMixin,
+    FastReadMixin,
+    ConditionalGetMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
+    queryset = Inventory.objects.select_related(
+        "group", "group__created_by", "created_by"
+    )
     serializer_class = InventorySerializer
     permission_classes = (IsAuthenticatedCustom,)
     pagination_class = CustomPagination
+    cursor_ordering = ("-created_at", "id")
+    fingerprint_tables = (InventoryGroup,)
+    query_filter = QueryFilter(
+        id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        group_id=FilterField(serializers.IntegerField(), ("exact", "in", "isnull")),
+        created_by_id=FilterField(serializers.IntegerField()),
+        code=FilterField(serializers.CharField(), ("exact", "in", "startswith")),
+        name=FilterField(serializers.CharField(), ("exact", "startswith")),
+        remaining=FilterField(serializers.IntegerField(), RANGE_LOOKUPS),
+        created_at=FilterField(serializers.DateTimeField(), RANGE_LOOKUPS),
+        group_subtree=FilterField(
+            serializers.IntegerField(),
+            to_q=lambda id: InventoryGroup.objects.subtree_q(id, "group__"),
+        ),
+    )
 
     def get_queryset(self):
         if self.request.method.lower() != "get":
@@ -35,11 +79,12 @@ class InventoryView(ModelViewSet):
 
         data = self.request.query_params.dict()
 
-        data.pop("page", None)
+        CustomPagination.pop_params(data)
+        SparseQuerysetMixin.pop_params(data)
 
         keyword = data.pop("keyword", None)
 
-        results = self.queryset.filter(**data)
+        results = self.query_filter.apply(self.queryset, data)
 
         if keyword:
             search_fields = (
@@ -49,8 +94,9 @@ class InventoryView(ModelViewSet):
                 "group__name",
                 "code",
             )
-            query = get_query(keyword, search_fields)
-            results = results.filter(query)
+            results = search(
+                results, keyword, search_fields, exact_field="code", prefix_field="name"
+            )
 
         return results
 
@@ -59,13 +105,28 @@ class InventoryView(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
-class InventoryGroupView(ModelViewSet):
-    queryset = InventoryGroup.objects.select_related(
-        "belongs_to", "created_by"
-    ).prefetch_related("group_inventories")
+class InventoryGroupView(
+    FastReadMixin, ConditionalGetMixin, SparseQuerysetMixin, ModelViewSet
+):
+    queryset = InventoryGroup.objects.select_related("created_by")
     serializer_class = InventoryGroupSerializer
     permission_classes = (IsAuthenticatedCustom,)
     pagination_class = CustomPagination
+    cursor_ordering = ("name", "id")
+    fingerprint_fields = ("updated_at", "group_inventories__updated_at")
+    fingerprint_counts = ("group_inventories",)
+    fingerprint_tables = (InventoryGroup,)
+    query_filter = QueryFilter(
+        id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        belongs_to_id=FilterField(
+            serializers.IntegerField(), ("exact", "in", "isnull")
+        ),
+        created_by_id=FilterField(serializers.IntegerField()),
+        name=FilterField(serializers.CharField(), ("exact", "startswith")),
+        group_subtree=FilterField(
+            serializers.IntegerField(), to_q=InventoryGroup.objects.subtree_q
+        ),
+    )
 
     def get_queryset(self):
         if self.request.method.lower() != "get":
@@ -73,11 +134,13 @@ class InventoryGroupView(ModelViewSet):
 
         data = self.request.query_params.dict()
 
-        data.pop("page", None)
+        CustomPagination.pop_params(data)
+        SparseQuerysetMixin.pop_params(data)
 
         keyword = data.pop("keyword", None)
+        data.pop("subtree_totals", None)
 
-        results = self.queryset.filter(**data)
+        results = self.query_filter.apply(self.queryset, data).order_by("name")
 
         if keyword:
             search_fields = (
@@ -85,21 +148,53 @@ class InventoryGroupView(ModelViewSet):
                 "created_by__fullname",
                 "name",
             )
-            query = get_query(keyword, search_fields)
-            results = results.filter(query)
+            results = search(
+                results, keyword, search_fields, exact_field="name", prefix_field="name"
+            )
 
         return results.annotate(total_items=Count("group_inventories"))
 
+    def get_list_plan(self, queryset):
+        if self.request.query_params.get("subtree_totals"):
+            return None
+        return super().get_list_plan(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        # Subtree totals are loaded for the groups being serialized only.
+        if args and self.request.query_params.get("subtree_totals"):
+            if kwargs.get("many"):
+                args = (list(args[0]), *args[1:])
+                InventoryGroup.objects.load_subtree_items(args[0])
+            else:
+                InventoryGroup.objects.load_subtree_items([args[0]])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_fingerprint(self, queryset):
+        fingerprint = super().get_fingerprint(queryset)
+        # Subtree totals count items outside the page's groups.
+        if self.request.query_params.get("subtree_totals"):
+            fingerprint["items"] = Inventory.objects.aggregate(
+                count=Count("id"), updated_at=Max("updated_at")
+            )
+        return fingerprint
+
     def create(self, request, *args, **kwargs):
         request.data.update({"created_by_id": request.user.id})
         return super().create(request, *args, **kwargs)
 
 
-class ShopView(ModelViewSet):
+class ShopView(FastReadMixin, ConditionalGetMixin, SparseQuerysetMixin, ModelViewSet):
     queryset = Shop.objects.select_related("created_by")
     serializer_class = ShopSerializer
     permission_classes = (IsAuthenticatedCustom,)
     pagination_class = CustomPagination
+    cursor_ordering = ("-created_at", "id")
+    query_filter = QueryFilter(
+        id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        created_by_id=FilterField(serializers.IntegerField()),
+        name=FilterField(serializers.CharField(), ("exact", "startswith")),
+        created_at=FilterField(serializers.DateTimeField(), RANGE_LOOKUPS),
+    )
 
     def get_queryset(self):
         if self.request.method.lower() != "get":
@@ -107,21 +202,22 @@ class ShopView(ModelViewSet):
 
         data = self.request.query_params.dict()
 
-        data.pop("page", None)
+        CustomPagination.pop_params(data)
+        SparseQuerysetMixin.pop_params(data)
 
         keyword = data.pop("keyword", None)
 
-        results = self.queryset.filter(**data)
+        results = self.query_filter.apply(self.queryset, data)
 
         if keyword:
             search_fields = (
                 "created_by__email",
                 "created_by__fullname",
-                "group",
                 "name",
             )
-            query = get_query(keyword, search_fields)
-            results = results.filter(query)
+            results = search(
+                results, keyword, search_fields, exact_field="name", prefix_field="name"
+            )
 
         return results
 
@@ -130,13 +226,30 @@ class ShopView(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
-class InvoiceView(ModelViewSet):
-    queryset = Invoice.objects.select_related("created_by", "shop").prefetch_related(
-        "invoice_items"
+class InvoiceView(
+    ExportMixin,
+    FastReadMixin,
+    ConditionalGetMixin,
+    SparseQuerysetMixin,
+    ModelViewSet,
+):
+    queryset = Invoice.objects.select_related(
+        "created_by", "shop", "shop__created_by"
+    ).prefetch_related(
+        "invoice_items__item__group__created_by", "invoice_items__item__created_by"
     )
     serializer_class = InvoiceSerializer
     permission_classes = (IsAuthenticatedCustom,)
     pagination_class = CustomPagination
+    cursor_ordering = ("-created_at", "id")
+    fingerprint_fields = ("created_at",)
+    fingerprint_tables = (InventoryGroup,)
+    query_filter = QueryFilter(
+        id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        shop_id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        created_by_id=FilterField(serializers.IntegerField()),
+        created_at=FilterField(serializers.DateTimeField(), RANGE_LOOKUPS),
+    )
 
     def get_queryset(self):
         if self.request.method.lower() != "get":
@@ -144,11 +257,12 @@ class InvoiceView(ModelViewSet):
 
         data = self.request.query_params.dict()
 
-        data.pop("page", None)
+        CustomPagination.pop_params(data)
+        SparseQuerysetMixin.pop_params(data)
 
         keyword = data.pop("keyword", None)
 
-        results = self.queryset.filter(**data)
+        results = self.query_filter.apply(self.queryset, data)
 
         if keyword:
             search_fields = (
@@ -156,8 +270,7 @@ class InvoiceView(ModelViewSet):
                 "created_by__fullname",
                 "shop__name",
             )
-            query = get_query(keyword, search_fields)
-            results = results.filter(query)
+            results = search(results, keyword, search_fields)
 
         return results
 
@@ -168,6 +281,25 @@ class InvoiceView(ModelViewSet):
         request.data.update({"created_by_id": request.user.id, "shop_id": shop})
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        invoice = serializer.save()
+        # Re-read with the list queryset's joins and prefetches, plus the
+        # groups and permissions of every user the response nests, so it
+        # takes the same number of queries for any basket size.
+        users = (
+            "created_by",
+            "shop__created_by",
+            "invoice_items__item__created_by",
+            "invoice_items__item__group__created_by",
+        )
+        serializer.instance = self.queryset.prefetch_related(
+            *(
+                f"{user}__{name}"
+                for user in users
+                for name in ("groups", "user_permissions")
+            )
+        ).get(pk=invoice.pk)
+
 
 class SummaryView(ModelViewSet):
     queryset = InventoryView.queryset
@@ -175,20 +307,7 @@ class SummaryView(ModelViewSet):
     http_method_names = ("get",)
 
     def list(self, request, *args, **kwargs):
-        total_inventory = InventoryView.queryset.filter(remaining__gt=0).count()
-        total_groups = InventoryGroupView.queryset.count()
-        total_shops = ShopView.queryset.count()
-        total_users = CustomUser.objects.filter(is_superuser=False).count()
-
-        return Response(
-            {
-                "total_inventory": total_inventory,
-                "total_groups": total_groups,
-                "total_shops": total_shops,
-                "total_users": total_users,
-            },
-            status=status.HTTP_200_OK,
-        )
+        return Response(DashboardCounter.objects.snapshot(), status=status.HTTP_200_OK)
 
 
 class SalesPerformanceView(ModelViewSet):
@@ -196,25 +315,44 @@ class SalesPerformanceView(ModelViewSet):
     permission_classes = (IsAuthenticatedCustom,)
     http_method_names = ("get",)
 
+    @cached_response("top_selling")
     def list(self, request, *args, **kwargs):
-        query_data = request.query_params.dict()
-        total = query_data.get("total", None)
-        query = self.queryset
-
-        if not total:
-            start_date = query_data.get("start_date", None)
-            end_date = query_data.get("end_date", None)
-
-            if start_date:
-                query = query.filter(
-                    inventory_invoices__created_at___range=[start_date, end_date]
+        sales, dated = filter_sales_dates(
+            DailySales.objects.filter(item__isnull=False), request.query_params
+        )
+        # Rank items in the rollup and only fetch the ten best sellers.
+        item_ids = list(
+            sales.values("item")
+            .annotate(quantity=Sum("quantity"))
+            .filter(quantity__gt=0)
+            .order_by("-quantity", "item")
+            .values_list("item", flat=True)[:10]
+        )
+        if not dated and len(item_ids) < 10:
+            # Without dates, unsold items fill the list with a sum of 0.
+            item_ids += self.queryset.exclude(id__in=item_ids).values_list(
+                "id", flat=True
+            )[: 10 - len(item_ids)]
+
+        items = (
+            self.queryset.filter(id__in=item_ids)
+            .annotate(
+                sum_of_items=functions.Coalesce(
+                    Subquery(
+                        sales.filter(item=OuterRef("pk"))
+                        .values("item")
+                        .annotate(quantity=Sum("quantity"))
+                        .values("quantity")
+                    ),
+                    0,
                 )
+            )
+            .order_by("-sum_of_items", "id")
+        )
 
-        items = query.annotate(
-            sum_of_items=functions.Coalesce(Sum("inventory_invoices__quantity"), 0)
-        ).order_by("-sum_of_items")[0:10]
-
-        response_data = InventoryWithSum(items, many=True).data
+        # Items nest their group, whose ancestors are SerializerMethodFields,
+        # so these ten rows have no read plan and are serialized by DRF.
+        response_data = serialize_many(InventoryWithSum, items)
         return Response(response_data, status=status.HTTP_200_OK)
 
 
@@ -223,64 +361,53 @@ class SaleByShopView(ModelViewSet):
     permission_classes = (IsAuthenticatedCustom,)
     http_method_names = ("get",)
 
+    @cached_response("sales_by_shop")
     def list(self, request, *args, **kwargs):
-        query_data = request.query_params.dict()
-        total = query_data.get("total", None)
+        query_data = request.query_params
         monthly = query_data.get("monthly", None)
-        query = ShopView.queryset
+        sales, dated = filter_sales_dates(DailySales.objects.all(), query_data)
 
-        if not total:
-            start_date = query_data.get("start_date", None)
-            end_date = query_data.get("end_date", None)
-
-            if start_date:
-                query = query.filter(
-                    sale_shop__created_at___range=[start_date, end_date]
-                )
         if monthly:
-            shops = (
-                query.annotate(monthly=functions.TruncMonth("created_at"))
-                .values("months", "name")
-                .annotate(
-                    amount_total=Sum(
-                        F("sale_shop__invoice_items__quantity")
-                        * F("sale_shop__invoice_items__amount")
-                    )
-                )
+            return Response(
+                sales_series(query_data, bucket="month", group_by="shop"),
+                status=status.HTTP_200_OK,
             )
 
-        else:
-            shops = query.annotate(
-                amount_total=Sum(
-                    F("sale_shop__invoice_items__quantity")
-                    * F("sale_shop__invoice_items__amount")
-                )
-            ).order_by("-amount_total")
+        results = ShopView.queryset.annotate(
+            amount_total=Subquery(
+                sales.filter(shop=OuterRef("pk"))
+                .values("shop")
+                .annotate(amount=Sum("amount"))
+                .values("amount")
+            )
+        )
+        if dated:
+            results = results.filter(amount_total__isnull=False)
+        results = results.order_by("-amount_total")
 
-        response_data = ShopWithAmountSerializer(shops, many=True).data
+        response_data = serialize_many(ShopWithAmountSerializer, results)
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class PurchaseView(ModelViewSet):
-    queryset = InvoiceView.queryset
+class SalesSeriesView(ModelViewSet):
+    queryset = DailySales.objects.all()
     permission_classes = (IsAuthenticatedCustom,)
     http_method_names = ("get",)
 
+    @cached_response("sales_series")
     def list(self, request, *args, **kwargs):
-        query_data = request.query_params.dict()
-        total = query_data.get("total", None)
-        query = InvoiceItem.objects.prefetch_related("shop", "item")
+        return Response(sales_series(request.query_params), status=status.HTTP_200_OK)
 
-        if not total:
-            start_date = query_data.get("start_date", None)
-            end_date = query_data.get("end_date", None)
 
-            if start_date:
-                query = query.filter(created_at___range=[start_date, end_date])
+class PurchaseView(ModelViewSet):
+    queryset = InvoiceView.queryset
+    permission_classes = (IsAuthenticatedCustom,)
+    http_method_names = ("get",)
 
-        query = query.aggregate(
-            amount_total=Sum(F("amount") * F("quantity")), total=Sum("quantity")
-        )
+    @cached_response("purchase_summary")
+    def list(self, request, *args, **kwargs):
+        sales, _ = filter_sales_dates(DailySales.objects.all(), request.query_params)
+        query = sales.aggregate(amount_total=Sum("amount"), total=Sum("quantity"))
 
         return Response(
             {
@@ -292,11 +419,13 @@ class PurchaseView(ModelViewSet):
         )
 
 
-class InventoryCSVLoaderView(ModelViewSet):
-    queryset = InventoryView.queryset
+class InventoryCSVLoaderView(ConditionalGetMixin, ModelViewSet):
+    queryset = InventoryImportJob.objects.all()
     permission_classes = (IsAuthenticatedCustom,)
-    http_method_names = ("post",)
-    serializer_class = InventorySerializer
+    http_method_names = ("post", "get")
+    serializer_class = InventoryImportJobSerializer
+    pagination_class = CustomPagination
+    cursor_ordering = ("-created_at", "id")
 
     def create(self, request, *args, **kwargs):
         try:
@@ -304,55 +433,72 @@ class InventoryCSVLoaderView(ModelViewSet):
         except Exception as e:
             raise Exception("You need to provide inventory CSV 'data'")
 
-        inventory_items = []
-        flag = False
+        if request.query_params.get("background"):
+            job = submit_import_job(data, request.user)
+            return Response(
+                self.serializer_class(job).data, status=status.HTTP_202_ACCEPTED
+            )
+
+        report = InventoryCSVImporter(request.user).run(data)
+        if not report["rows"]:
+            raise Exception("Provide csv file")
+
+        return Response({"success": "Inventory Items added successfully", **report})
+
 
+class PhotoView(ModelViewSet):
+    queryset = PhotoBlob.objects.all()
+    serializer_class = PhotoBlobSerializer
+    http_method_names = ("get", "post")
+
+    def get_permissions(self):
+        # Photos are addressed by the sha256 of their content, so <img> tags
+        # can load them without an Authorization header.
+        if self.action == "retrieve":
+            return []
+        return [IsAuthenticatedCustom()]
+
+    def list(self, request, *args, **kwargs):
+        raise NotFound()
+
+    def create(self, request, *args, **kwargs):
         try:
-            csv_reader = csv.reader(codecs.iterdecode(data, "utf-8"))
-            for row in csv_reader:
-                if not row[0] or not str.isdigit(row[0]):
-                    continue
-                valid_inventory = self.serializer_class(
-                    data={
-                        "group_id": row[0],
-                        "total": row[1],
-                        "name": row[2],
-                        "price": row[3],
-                        "photo": row[4],
-                        "created_by_id": request.user.id,
-                    }
-                )
-                valid_inventory.is_valid(raise_exception=True)
-                old_data = Inventory.objects.filter(
-                    name=valid_inventory.validated_data.get("name")
-                )
-                if len(old_data) > 0:
-                    flag = True
-                    old_data = old_data[0]
-                    old_data.remaining += valid_inventory.validated_data.get("total")
-                    old_data.total += valid_inventory.validated_data.get("total")
-                    old_data.price = valid_inventory.validated_data.get("price")
-                    old_data.save()
-                else:
-                    inventory_items.append(
-                        {
-                            "group_id": row[0],
-                            "total": row[1],
-                            "name": row[2],
-                            "price": row[3],
-                            "photo": row[4],
-                            "created_by_id": request.user.id,
-                        }
-                    )
+            data = request.FILES["data"]
+        except Exception:
+            raise Exception("You need to provide a photo as 'data'")
 
-        except Exception as e:
-            raise Exception(e)
-        if len(inventory_items) < 0 and not flag:
-            raise Exception("Provide csv file")
+        if data.size > get_photo_store().max_size:
+            raise Exception(f"photo is larger than {get_photo_store().max_size} bytes")
+
+        content = data.read()
+        content_type = get_photo_store().image_content_type(content)
+        blob = PhotoBlob.objects.store(content, content_type)
+        return Response(
+            self.serializer_class(blob).data, status=status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        blob = PhotoBlob.objects.filter(digest=kwargs["pk"]).first()
+        if blob is None:
+            raise NotFound()
 
-        if len(inventory_items) > 0:
-            data_validation = self.serializer_class(data=inventory_items, many=True)
-            data_validation.is_valid(raise_exception=True)
-            data_validation.save()
+        thumbnail = request.query_params.get("size") == "thumbnail"
+        thumbnail = thumbnail and blob.has_thumbnail
+        etag = f'"{blob.digest}{"-thumbnail" if thumbnail else ""}"'
 
-        return Response({"success": "Inventory Items added successfully"})
+        content_type = THUMBNAIL_CONTENT_TYPE if thumbnail else blob.content_type
+        if content_type not in IMAGE_CONTENT_TYPES.values():
+            content_type = "application/octet-stream"
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(
+                get_photo_store().open(blob.digest, thumbnail),
+                content_type=content_type,
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        # Never let a stored file be sniffed or rendered as a document.
+        response["X-Content-Type-Options"] = "nosniff"
+        response["Content-Security-Policy"] = "default-src 'none'"
+        return response
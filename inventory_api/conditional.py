@@ -0,0 +1,135 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .fast_read import PlannedRows
+from .sparse import get_relations
+
+
+# Conditional GET for ModelViewSets. Before serializing, a single aggregate
+# query fingerprints the rows the response would render (row count plus the
+# MAX of each of `fingerprint_fields` and of the updated_at of every relation
+# the serializer nests, and the COUNT of those relations, of
+# `fingerprint_counts` and of every nullable foreign key of the rendered rows,
+# which changes when a related row is deleted or set to NULL); if the
+# client's If-None-Match or If-Modified-Since
+# still matches, a 304 is returned without serializing. Lists fingerprint the
+# fetched page only, with its ids and the pagination envelope, and only carry
+# an ETag: MAX(updated_at) alone would not notice deletes.
+class ConditionalGetMixin:
+    fingerprint_fields = ("updated_at",)
+    # Relations rendered through annotations (e.g. a count of related rows)
+    # rather than nested.
+    fingerprint_counts = ()
+    # Models rendered with values read from rows outside the response (e.g.
+    # group ancestors): when one is rendered, its whole table is fingerprinted.
+    fingerprint_tables = ()
+    cache_control = "private, no-cache"
+
+    def get_nested_models(self):
+        selects, prefetches = get_relations(self.get_serializer())
+        models = {}
+        for path in (*selects, *prefetches):
+            model = self.queryset.model
+            for name in path.split("__"):
+                model = model._meta.get_field(name).related_model
+            models[path] = model
+        return models
+
+    def get_fingerprint(self, queryset):
+        nested_models = self.get_nested_models()
+        fields = list(self.fingerprint_fields)
+        for path, model in nested_models.items():
+            if any(field.name == "updated_at" for field in model._meta.fields):
+                fields.append(f"{path}__updated_at")
+
+        rows = self.queryset.model._default_manager.filter(
+            pk__in=queryset.order_by().values("pk")
+        )
+        counts = [*nested_models, *self.fingerprint_counts]
+        for prefix, model in [
+            ("", self.queryset.model),
+            *((f"{path}__", model) for path, model in nested_models.items()),
+        ]:
+            counts += [
+                prefix + field.name
+                for field in model._meta.fields
+                if field.many_to_one and field.null
+            ]
+        fingerprint = rows.aggregate(
+            rows=Count("pk", distinct=True),
+            **{field: Max(field) for field in dict.fromkeys(fields)},
+            **{f"{path}__count": Count(path) for path in dict.fromkeys(counts)},
+        )
+        rendered = {self.queryset.model, *nested_models.values()}
+        for model in self.fingerprint_tables:
+            if model in rendered:
+                fingerprint[model._meta.db_table] = model._default_manager.aggregate(
+                    count=Count("pk"), updated_at=Max("updated_at")
+                )
+        return fingerprint
+
+    def make_etag(self, request, fingerprint):
+        content = repr((request.get_full_path(), sorted(fingerprint.items())))
+        return f'"{hashlib.sha1(content.encode()).hexdigest()}"'
+
+    def conditional_response(self, request, fingerprint, build, last_modified=None):
+        etag = self.make_etag(request, fingerprint)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+            headers["Last-Modified"] = http_date(last_modified)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.conditional_response(
+                request,
+                self.get_fingerprint(queryset),
+                lambda: Response(self.get_serializer(queryset, many=True).data),
+            )
+
+        pks = [row[0] if isinstance(page, PlannedRows) else row.pk for row in page]
+        fingerprint = self.get_fingerprint(
+            self.queryset.model._default_manager.filter(pk__in=pks)
+        )
+        fingerprint["page"] = (pks, self.get_paginated_response([]).data)
+        return self.conditional_response(
+            request,
+            fingerprint,
+            lambda: self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        fingerprint = self.get_fingerprint(queryset)
+        if not fingerprint["rows"]:
+            return super().retrieve(request, *args, **kwargs)
+
+        dates = [value for value in fingerprint.values() if hasattr(value, "timestamp")]
+        return self.conditional_response(
+            request,
+            fingerprint,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            last_modified=max(dates, default=None),
+        )
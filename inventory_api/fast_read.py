@@ -0,0 +1,369 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+
+# A fast path for read-only lists. A ReadPlan is compiled once per serializer
+# shape: the columns to fetch with values_list() and, per output field, a
+# getter that turns a row into exactly what the field's to_representation()
+# would have returned. Rendering N rows then costs one query (plus one per
+# many-to-many field) and a dict comprehension per row, with no model
+# instances or DRF field calls. Serializers using anything the plan can't
+# reproduce (SerializerMethodFields, nested lists, dotted sources...) are not
+# planned and keep going through DRF.
+
+MAX_PLANS = 256
+
+SKIP = object()
+
+
+class PlanFallback(Exception):
+    pass
+
+
+# Lists built by a ReadPlan. They only hold dicts, lists, str, int, bool,
+# None and floats in the range orjson formats like the json module.
+class PlannedList(list):
+    pass
+
+
+def check_plain(value):
+    if type(value) not in (int, str, bool):
+        raise PlanFallback(value)
+    return value
+
+
+def check_float(value):
+    value = float(value)
+    # Outside this range repr() switches to exponents, which orjson formats
+    # differently (1e+16 vs 1e16); NaN and infinity fail the check too.
+    if value and not 1e-4 <= abs(value) < 1e16:
+        raise PlanFallback(value)
+    return value
+
+
+def datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        raise PlanFallback(field)
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if tz is None:
+        raise PlanFallback(field)
+
+    def convert(value):
+        if value.tzinfo is None:
+            raise PlanFallback(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+def date_converter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        raise PlanFallback(field)
+    return lambda value: value.isoformat()
+
+
+def choice_converter(field):
+    choices = field.choice_strings_to_values
+    return lambda value: value if value == "" else choices.get(str(value), value)
+
+
+CONVERTERS = {
+    serializers.BooleanField: lambda field: bool,
+    serializers.CharField: lambda field: str,
+    serializers.EmailField: lambda field: str,
+    serializers.SlugField: lambda field: str,
+    serializers.URLField: lambda field: str,
+    serializers.IntegerField: lambda field: int,
+    serializers.FloatField: lambda field: check_float,
+    serializers.DateTimeField: datetime_converter,
+    serializers.DateField: date_converter,
+    serializers.ChoiceField: choice_converter,
+    serializers.ReadOnlyField: lambda field: check_plain,
+}
+
+
+def column_getter(index, convert):
+    def get(row, related):
+        value = row[index]
+        return None if value is None else convert(value)
+
+    return get
+
+
+def values_getter(indexes, represent):
+    return lambda row, related: represent(*[row[index] for index in indexes])
+
+
+def nested_getter(index, fields):
+    def get(row, related):
+        if row[index] is None:
+            return None
+        return {name: getter(row, related) for name, getter in fields}
+
+    return get
+
+
+def many_getter(key, index):
+    return lambda row, related: related[key].get(row[index], [])
+
+
+class ReadPlan:
+    def __init__(self, model):
+        self.model = model
+        self.columns = [model._meta.pk.name]
+        self.fields = []
+        self.many_related = []
+
+    def add_column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def rows(self, queryset, extra=()):
+        columns = [*self.columns, *(name for name in extra if name not in self.columns)]
+        return queryset.values_list(*columns, named=True)
+
+    def load_related(self, rows):
+        related = []
+        for model_field, index in self.many_related:
+            owners = {row[index] for row in rows if row[index] is not None}
+            name = model_field.related_query_name()
+            values = defaultdict(list)
+            if owners:
+                for owner, pk in model_field.related_model._default_manager.filter(
+                    **{f"{name}__in": owners}
+                ).values_list(name, "pk"):
+                    values[owner].append(pk)
+            related.append(values)
+        return related
+
+    def represent(self, rows):
+        related = self.load_related(rows)
+        fields = self.fields
+        return PlannedList(
+            [{name: getter(row, related) for name, getter in fields} for row in rows]
+        )
+
+    def compile(self, serializer, annotations, prefix=""):
+        model = serializer.Meta.model
+        fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            getter = self.compile_field(model, field, annotations, prefix)
+            if getter is not SKIP:
+                fields.append((name, getter))
+        return fields
+
+    def compile_field(self, model, field, annotations, prefix):
+        # Fields that read several columns, e.g. PhotoField.
+        if hasattr(field, "value_columns"):
+            indexes = [self.add_column(prefix + name) for name in field.value_columns]
+            return values_getter(indexes, field.represent_values)
+
+        if field.source == "*" or "." in field.source:
+            raise PlanFallback(field)
+
+        if isinstance(field, serializers.ManyRelatedField):
+            model_field = self.get_model_field(model, field.source)
+            child = field.child_relation
+            if (
+                not model_field.many_to_many
+                or type(child) is not serializers.PrimaryKeyRelatedField
+                or child.pk_field is not None
+            ):
+                raise PlanFallback(field)
+            index = self.add_column(prefix + model._meta.pk.name)
+            self.many_related.append((model_field, index))
+            return many_getter(len(self.many_related) - 1, index)
+
+        if isinstance(field, serializers.BaseSerializer):
+            model_field = self.get_model_field(model, field.source)
+            if (
+                not isinstance(field, serializers.ModelSerializer)
+                or not (model_field.many_to_one or model_field.one_to_one)
+                or not model_field.concrete
+            ):
+                raise PlanFallback(field)
+            path = f"{prefix}{field.source}__"
+            index = self.add_column(path + model_field.related_model._meta.pk.name)
+            return nested_getter(index, self.compile(field, (), path))
+
+        if type(field) is serializers.PrimaryKeyRelatedField:
+            if field.pk_field is not None:
+                raise PlanFallback(field)
+            convert = check_plain
+        elif type(field) in CONVERTERS:
+            convert = CONVERTERS[type(field)](field)
+        else:
+            raise PlanFallback(field)
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            if field.source in annotations:
+                return column_getter(self.add_column(field.source), convert)
+            if hasattr(model, field.source):
+                raise PlanFallback(field)
+            # The attribute is missing, which DRF handles in get_attribute().
+            if field.default is not empty:
+                raise PlanFallback(field)
+            if field.allow_null:
+                return lambda row, related: None
+            if not field.required:
+                return SKIP
+            raise PlanFallback(field)
+
+        if not model_field.concrete or model_field.many_to_many:
+            raise PlanFallback(field)
+        return column_getter(self.add_column(prefix + field.source), convert)
+
+    def get_model_field(self, model, name):
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise PlanFallback(name)
+
+
+def get_signature(serializer):
+    signature = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            child = get_signature(field.child)
+        elif isinstance(field, serializers.BaseSerializer):
+            child = get_signature(field)
+        else:
+            child = None
+        signature.append((name, type(field), field.source, child))
+    return (type(serializer), tuple(signature))
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+# The plan for rendering `queryset` with `serializer` (a child serializer,
+# not a ListSerializer), or None when it has to go through DRF.
+def get_read_plan(serializer, queryset):
+    if not getattr(settings, "FAST_READ", True):
+        return None
+    if not isinstance(queryset, QuerySet) or queryset.query.values_select:
+        return None
+    annotations = tuple(queryset.query.annotations)
+    key = (get_signature(serializer), annotations)
+    try:
+        return _plans[key]
+    except KeyError:
+        pass
+
+    try:
+        plan = ReadPlan(serializer.Meta.model)
+        plan.fields = plan.compile(serializer, annotations)
+    except PlanFallback:
+        plan = None
+    with _plans_lock:
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        _plans[key] = plan
+    return plan
+
+
+class PlannedRows(list):
+    def __init__(self, rows, plan, queryset):
+        super().__init__(rows)
+        self.plan = plan
+        self.queryset = queryset
+
+
+class PlannedSerializer:
+    def __init__(self, rows, fallback):
+        self.rows = rows
+        self.fallback = fallback
+
+    @property
+    def data(self):
+        try:
+            return self.rows.plan.represent(self.rows)
+        except PlanFallback:
+            # Some value can't be rendered exactly (e.g. a float orjson
+            # would format differently): serialize these rows through DRF.
+            # Refetched by pk with the queryset's joins and annotations; a
+            # sliced queryset can't be filtered, so its limits are dropped.
+            pks = [row[0] for row in self.rows]
+            queryset = self.rows.queryset._chain()
+            queryset.query.clear_limits()
+            instances = queryset.in_bulk(pks)
+            return self.fallback([instances[pk] for pk in pks]).data
+
+
+# Serialize a queryset with `serializer_class(many=True)`, using a ReadPlan
+# when the serializer allows it.
+def serialize_many(serializer_class, queryset, context=None):
+    context = context or {}
+    serializer = serializer_class(queryset, many=True, context=context)
+    plan = get_read_plan(serializer.child, queryset)
+    if plan is None:
+        return serializer.data
+    rows = PlannedRows(plan.rows(queryset), plan, queryset)
+    return PlannedSerializer(
+        rows,
+        lambda instances: serializer_class(instances, many=True, context=context),
+    ).data
+
+
+# For list views: pages are fetched with values_list() and rendered by the
+# list serializer's ReadPlan instead of DRF when it has one.
+class FastReadMixin:
+    def get_row_columns(self, queryset):
+        columns = [name.lstrip("-") for name in getattr(self, "cursor_ordering", ())]
+        if "search_rank" in queryset.query.annotations:
+            columns.append("search_rank")
+        return columns
+
+    def get_list_plan(self, queryset):
+        if self.request.method != "GET":
+            return None
+        return get_read_plan(self.get_serializer(), queryset)
+
+    def paginate_queryset(self, queryset):
+        plan = self.get_list_plan(queryset)
+        if plan is None:
+            return super().paginate_queryset(queryset)
+        page = super().paginate_queryset(
+            plan.rows(queryset, self.get_row_columns(queryset))
+        )
+        if page is None:
+            return None
+        return PlannedRows(page, plan, queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        if not args or not kwargs.get("many"):
+            return super().get_serializer(*args, **kwargs)
+
+        data = args[0]
+        if isinstance(data, QuerySet):
+            plan = self.get_list_plan(data)
+            if plan is not None:
+                data = PlannedRows(plan.rows(data), plan, data)
+        if not isinstance(data, PlannedRows):
+            return super().get_serializer(*args, **kwargs)
+        return PlannedSerializer(
+            data,
+            lambda instances: super(FastReadMixin, self).get_serializer(
+                instances, **kwargs
+            ),
+        )
@@ -0,0 +1,65 @@
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+# Query-param filtering for list views. Each view declares the fields and
+# lookups it accepts (all of them backed by an index); anything else is
+# rejected with a 400 instead of being passed to queryset.filter().
+
+RANGE_LOOKUPS = ("exact", "gt", "gte", "lt", "lte", "range")
+
+
+class FilterField:
+    # `to_q` builds the condition from the coerced value for filters that
+    # aren't a plain field lookup.
+    def __init__(self, field, lookups=("exact",), to_q=None):
+        self.field = field
+        self.lookups = lookups
+        self.to_q = to_q
+
+    def coerce(self, lookup, value):
+        if lookup == "isnull":
+            return serializers.BooleanField().to_internal_value(value)
+        if lookup in ("in", "range"):
+            values = [self.field.to_internal_value(v) for v in value.split(",")]
+            if lookup == "range" and len(values) != 2:
+                raise ValidationError("Expected two comma separated values.")
+            return values
+        return self.field.to_internal_value(value)
+
+
+class QueryFilter:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def resolve(self, key):
+        if key in self.fields and "exact" in self.fields[key].lookups:
+            return key, "exact"
+        name, _, lookup = key.rpartition("__")
+        if name in self.fields and lookup in self.fields[name].lookups:
+            return name, lookup
+        return None, None
+
+    def apply(self, queryset, params):
+        conditions = Q()
+        filters = {}
+        errors = {}
+        for key, value in params.items():
+            name, lookup = self.resolve(key)
+            if name is None:
+                errors[key] = ["Filtering on this field is not allowed."]
+                continue
+            field = self.fields[name]
+            try:
+                value = field.coerce(lookup, value)
+            except ValidationError as e:
+                errors[key] = e.detail
+                continue
+            if field.to_q is not None:
+                conditions &= field.to_q(value)
+            else:
+                filters[f"{name}__{lookup}"] = value
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(conditions, **filters)
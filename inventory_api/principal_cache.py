@@ -0,0 +1,163 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULT_PRINCIPAL_CACHE = {
+    "BACKEND": "local",
+    "TTL": 300,
+    "LOCAL_TTL": 5,
+    "MAX_ENTRIES": 1000,
+    "CACHE_ALIAS": "default",
+}
+
+
+class LocalPrincipalBackend:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class SharedPrincipalBackend:
+    # Size is bounded by the MAX_ENTRIES/eviction policy of the Django cache
+    # behind CACHE_ALIAS, so every worker process sees the same entries.
+    # Keys carry a generation so clear() only drops this cache's entries,
+    # not everything else stored under the alias.
+    key_prefix = "principal"
+
+    def __init__(self, ttl, alias):
+        self.ttl = ttl
+        self.cache = caches[alias]
+        self.generation_key = f"{self.key_prefix}:generation"
+
+    def make_key(self, key):
+        generation = self.cache.get_or_set(self.generation_key, 0, None)
+        return f"{self.key_prefix}:{generation}:{key}"
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value):
+        self.cache.set(self.make_key(key), value, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def clear(self):
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 1, None)
+
+    def size(self):
+        return None
+
+
+class PrincipalCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, user_id, loader):
+        key = str(user_id)
+        user = self.backend.get(key)
+        if user is not None:
+            self._incr("hits")
+            return copy.copy(user)
+
+        self._incr("misses")
+        user = loader(user_id)
+        if user is not None:
+            self.backend.set(key, user)
+        return user
+
+    def invalidate(self, user_id):
+        if user_id is not None:
+            self.backend.delete(str(user_id))
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self.backend.size(),
+        }
+
+    def _incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def build_principal_cache():
+    config = {
+        **DEFAULT_PRINCIPAL_CACHE,
+        **getattr(settings, "PRINCIPAL_CACHE", {}),
+    }
+    if config["BACKEND"] == "shared":
+        backend = SharedPrincipalBackend(config["TTL"], config["CACHE_ALIAS"])
+    elif config["BACKEND"] == "local":
+        # Saves only invalidate the saving process's entries, so other workers
+        # may serve a changed user until LOCAL_TTL expires.
+        backend = LocalPrincipalBackend(
+            min(config["TTL"], config["LOCAL_TTL"]), config["MAX_ENTRIES"]
+        )
+    else:
+        raise ValueError(f"Unknown principal cache backend '{config['BACKEND']}'")
+    return PrincipalCache(backend)
+
+
+_principal_cache = None
+_principal_cache_lock = threading.Lock()
+
+
+def get_principal_cache():
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                _principal_cache = build_principal_cache()
+    return _principal_cache
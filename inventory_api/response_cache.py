@@ -0,0 +1,312 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+
+from .fast_read import PlannedList
+from .renderers import FastJSONRenderer
+
+
+DEFAULT_RESPONSE_CACHE = {
+    "BACKEND": "file",
+    "TTL": 60,
+    "TTLS": {},
+    "MAX_ENTRIES": 500,
+    "DIR": "response_cache",
+}
+
+# Cached entries are stored under a generation number. Invalidating bumps the
+# generation instead of deleting entries, so a response computed while a
+# write was committing is stored under a key nobody will read again. Each
+# scope (e.g. analytics, users) has its own generation, so writes only
+# invalidate the responses built from them.
+DEFAULT_SCOPE = "analytics"
+
+
+class LocalResponseBackend:
+    # Other processes' writes don't invalidate these entries.
+    shared = False
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, scope):
+        return self._generations.get(scope, 0)
+
+    def bump(self, scope):
+        with self._lock:
+            self._generations[scope] = self.generation(scope) + 1
+            for key in [key for key in self._entries if key.startswith(f"{scope}:")]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class DummyResponseBackend:
+    # Caches nothing, e.g. while auditing the queries behind each endpoint.
+    shared = True
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generation(self, scope):
+        return 0
+
+    def bump(self, scope):
+        pass
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return 0
+
+
+class FileResponseBackend:
+    # A stand-in for a shared cache: every worker process on the host reads
+    # and invalidates the same directory.
+    shared = True
+    suffix = ".cache"
+
+    def __init__(self, directory, max_entries):
+        self.directory = str(directory)
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def entry_path(self, key):
+        return self.path(hashlib.sha256(key.encode()).hexdigest() + self.suffix)
+
+    def write(self, path, data):
+        tmp_path = self.path(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as destination:
+            destination.write(data)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        return [
+            entry.path
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(self.suffix)
+        ]
+
+    def get(self, key):
+        try:
+            with open(self.entry_path(key), "rb") as source:
+                expires_at, value = pickle.load(source)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at <= time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        self.write(self.entry_path(key), pickle.dumps((time.time() + ttl, value)))
+        entries = self.entries()
+        if len(entries) > self.max_entries:
+            entries.sort(key=os.path.getmtime)
+            for path in entries[: len(entries) - self.max_entries]:
+                self.remove(path)
+
+    def generation_path(self, scope):
+        return self.path(f"{scope}.generation")
+
+    def generation(self, scope):
+        try:
+            with open(self.generation_path(scope), "rb") as source:
+                return int(source.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, scope):
+        self.write(
+            self.generation_path(scope), str(self.generation(scope) + 1).encode()
+        )
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for path in self.entries():
+            self.remove(path)
+
+    def size(self):
+        return len(self.entries())
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl, ttls):
+        self.backend = backend
+        self.ttl = ttl
+        self.ttls = ttls
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, name, request, scope):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        generation = self.backend.generation(scope)
+        return f"{scope}:{generation}:{name}?{urlencode(params)}"
+
+    def respond(self, name, request, compute, scope=DEFAULT_SCOPE):
+        ttl = self.ttls.get(name, self.ttl)
+        if not self.backend.shared:
+            # Writes in other workers go unnoticed, so only the default TTL
+            # bounds how stale an entry can be.
+            ttl = min(ttl, self.ttl)
+        key = self.make_key(name, request, scope)
+        entry = self.backend.get(key)
+        if entry is None:
+            self._incr("misses")
+            response = compute()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = FastJSONRenderer().render(response.data)
+            data = json.loads(content)
+            if isinstance(response.data, PlannedList):
+                data = PlannedList(data)
+            entry = (f'"{hashlib.sha1(content).hexdigest()}"', data)
+            self.backend.set(key, entry, ttl)
+            cache_status = "MISS"
+        else:
+            self._incr("hits")
+            cache_status = "HIT"
+
+        etag, data = entry
+        if etag in request.headers.get("If-None-Match", ""):
+            self._incr("not_modified")
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        # Clients revalidate with the ETag, so a write is never served stale
+        # from their own cache.
+        response["Cache-Control"] = "private, no-cache"
+        response["X-Cache"] = cache_status
+        return response
+
+    def invalidate(self, scope=DEFAULT_SCOPE):
+        # Only drop entries once the write is visible to other connections.
+        transaction.on_commit(lambda: self.backend.bump(scope))
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "size": self.backend.size(),
+        }
+
+    def _incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def build_response_cache():
+    config = {
+        **DEFAULT_RESPONSE_CACHE,
+        **getattr(settings, "RESPONSE_CACHE", {}),
+    }
+    if config["BACKEND"] == "file":
+        backend = FileResponseBackend(config["DIR"], config["MAX_ENTRIES"])
+    elif config["BACKEND"] == "local":
+        backend = LocalResponseBackend(config["MAX_ENTRIES"])
+    elif config["BACKEND"] == "dummy":
+        backend = DummyResponseBackend()
+    else:
+        raise ValueError(f"Unknown response cache backend '{config['BACKEND']}'")
+    return ResponseCache(backend, config["TTL"], config["TTLS"])
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = build_response_cache()
+    return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    global _response_cache
+    if setting == "RESPONSE_CACHE":
+        _response_cache = None
+
+
+def cached_response(name, scope=DEFAULT_SCOPE):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            return get_response_cache().respond(
+                name, request, lambda: method(view, request, *args, **kwargs), scope
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,88 @@
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Concat, Lower
+
+from .utils import get_query, normalize_query
+
+
+# Models that support keyword search declare SEARCH_FIELDS and a
+# `search_document` TextField holding those values lower-cased and joined by
+# spaces. On Postgres the column carries a pg_trgm GIN index, so a substring
+# match on it is an index scan instead of OR-ed LIKEs across joined tables.
+
+
+def build_search_document(obj, fields):
+    values = []
+    for field_name in fields:
+        value = obj
+        for part in field_name.split("__"):
+            value = getattr(value, part, None) if value is not None else None
+        values.append("" if value is None else str(value))
+    return " ".join(values).lower()
+
+
+def search_document_expression(model, fields):
+    parts = []
+    for field_name in fields:
+        if "__" in field_name:
+            relation, column = field_name.split("__", 1)
+            related_model = model._meta.get_field(relation).related_model
+            value = Subquery(
+                related_model._default_manager.filter(
+                    pk=OuterRef(f"{relation}_id")
+                ).values(column)[:1]
+            )
+        else:
+            value = F(field_name)
+        if parts:
+            parts.append(Value(" "))
+        parts.append(Coalesce(value, Value(""), output_field=TextField()))
+    return Lower(Concat(*parts, output_field=TextField()))
+
+
+def refresh_search_documents(queryset, fields=None):
+    fields = fields or queryset.model.SEARCH_FIELDS
+    return queryset.update(
+        search_document=search_document_expression(queryset.model, fields)
+    )
+
+
+def search(queryset, keyword, search_fields, exact_field=None, prefix_field=None):
+    terms = normalize_query(keyword)
+    if not terms:
+        return queryset
+
+    if hasattr(queryset.model, "SEARCH_FIELDS"):
+        for term in terms:
+            queryset = queryset.filter(search_document__contains=term.lower())
+    else:
+        queryset = queryset.filter(get_query(keyword, search_fields))
+
+    if exact_field is None and prefix_field is None:
+        return queryset
+    return rank(queryset, " ".join(terms), exact_field, prefix_field)
+
+
+# Orders matches by quality: an exact match on exact_field first, then a
+# prefix match on prefix_field, then everything else in the queryset's own
+# ordering. The rank is computed by the database so paginating the ranked
+# results does not load every candidate row.
+def rank(queryset, phrase, exact_field=None, prefix_field=None):
+    whens = []
+    if exact_field:
+        whens.append(When(Q(**{f"{exact_field}__iexact": phrase}), then=Value(0)))
+    if prefix_field:
+        whens.append(When(Q(**{f"{prefix_field}__istartswith": phrase}), then=Value(1)))
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(
+        search_rank=Case(*whens, default=Value(2), output_field=IntegerField())
+    ).order_by("search_rank", *ordering)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,10 +27,93 @@ SECRET_KEY = "django-insecure-_^!7l4%n(0q_a%1iu_n&g9to*g*#-!(iro6x%w69jv%%1vqgv0
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
+TESTING = sys.argv[1:2] == ["test"]
+
 ALLOWED_HOSTS = ["*"]
 AUTH_USER_MODEL = "user_control.CustomUser"
 REST_FRAMEWORK = {
-    "EXCEPTION_HANDLER": "inventory_api.custom_methods.custom_exception_handler"
+    "EXCEPTION_HANDLER": "inventory_api.custom_methods.custom_exception_handler",
+    "DEFAULT_RENDERER_CLASSES": [
+        "inventory_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+# Read-only lists are fetched with values_list() and mapped to JSON by
+# precompiled read plans (inventory_api.fast_read) instead of DRF fields.
+FAST_READ = os.environ.get("FAST_READ", "on") == "on"
+# Unfiltered list pages over tables larger than this report the planner's
+# row estimate instead of running COUNT(*).
+APPROXIMATE_COUNT_THRESHOLD = 10000
+# Authenticated principals resolved from JWTs. BACKEND is "local" (per-process
+# LRU) or "shared" (the Django cache named by CACHE_ALIAS). Other processes
+# can't invalidate a local entry, so local entries live LOCAL_TTL seconds.
+PRINCIPAL_CACHE = {
+    "BACKEND": os.environ.get("PRINCIPAL_CACHE_BACKEND", "local"),
+    "TTL": 300,
+    "LOCAL_TTL": 5,
+    "MAX_ENTRIES": 1000,
+    "CACHE_ALIAS": "default",
+}
+# UserActivities are buffered and written with bulk_create by a background
+# thread. MODE "sync" writes each activity inline, and is the default under
+# manage.py test so tests see their activities as soon as they commit.
+ACTIVITY_WRITER = {
+    "MODE": os.environ.get("ACTIVITY_WRITER_MODE", "sync" if TESTING else "async"),
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_QUEUE_SIZE": 10000,
+}
+# UserActivities are partitioned by month on Postgres. Lists filtered on
+# created_at (or with ?recent=1, the last RECENT_MONTHS months) only read the
+# matching partitions; the maintain_activity_partitions command creates
+# partitions PREMAKE_MONTHS ahead and moves months past RETENTION_MONTHS to
+# gzipped NDJSON in ARCHIVE_DIR.
+ACTIVITY_PARTITIONS = {
+    "RECENT_MONTHS": 3,
+    "PREMAKE_MONTHS": 3,
+    "RETENTION_MONTHS": 12,
+    "ARCHIVE_DIR": BASE_DIR / "activity_archive",
+    "CHUNK_SIZE": 5000,
+}
+# Background CSV imports. Uploads are stored under DIR; MODE "thread" runs
+# jobs in an in-process pool, MODE "queue" leaves them for the
+# run_import_jobs management command. Running jobs that saved no progress
+# for STALE_AFTER seconds are resumed by the next run.
+IMPORT_JOBS = {
+    "MODE": os.environ.get("IMPORT_JOBS_MODE", "thread"),
+    "WORKERS": 2,
+    "DIR": BASE_DIR / "import_jobs",
+    "STALE_AFTER": 600,
+}
+# Cached analytics responses, invalidated when invoices, items, groups or
+# shops are written, and the user directory, invalidated when users are.
+# BACKEND is "file" (shared through DIR by every process on the host),
+# "local" (per-process, so only for a single worker, e.g. in tests) or
+# "dummy" (caches nothing). TTLS
+# overrides TTL (seconds) per endpoint; with "local" they can only shorten it.
+# Tests use "local" so runs don't share entries through DIR.
+RESPONSE_CACHE = {
+    "BACKEND": os.environ.get("RESPONSE_CACHE_BACKEND", "local" if TESTING else "file"),
+    "TTL": 60,
+    "TTLS": {
+        "top_selling": 300,
+        "sales_by_shop": 300,
+        "sales_series": 300,
+        "purchase_summary": 120,
+        "user_directory": 600,
+    },
+    "MAX_ENTRIES": 500,
+    "DIR": BASE_DIR / "response_cache",
+}
+# Inventory photos, stored once per content hash with a thumbnail. BACKEND is
+# "local" (files under DIR) or "storage" (Django's default storage, e.g. an
+# object store, under PREFIX).
+PHOTO_STORE = {
+    "BACKEND": os.environ.get("PHOTO_STORE_BACKEND", "local"),
+    "DIR": BASE_DIR / "photos",
+    "PREFIX": "photos",
+    "MAX_SIZE": 5 * 1024 * 1024,
+    "THUMBNAIL_SIZE": (200, 200),
 }
 # Application definition
 
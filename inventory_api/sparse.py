@@ -0,0 +1,133 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+# Sparse fieldsets for GET responses. `?fields=` picks the fields returned and
+# `?expand=` names the relations to nest; both take dotted paths for nested
+# serializers (e.g. ?fields=id,invoice_items.quantity&expand=shop). In lists
+# and exports, relations in `expandable_fields` are returned as their id
+# unless expanded.
+
+COMPACT_ACTIONS = ("list", "export")
+
+
+def requested_names(request, param, path):
+    prefix = f"{path}." if path else ""
+    names = set()
+    for value in request.query_params.get(param, "").split(","):
+        value = value.strip()
+        if value and value.startswith(prefix):
+            names.add(value[len(prefix) :].split(".")[0])
+    return names
+
+
+class SparseFieldsMixin:
+    expandable_fields = ()
+    # Model columns read by fields that don't map onto one by their source,
+    # e.g. SerializerMethodFields. Fields declaring `value_columns` (read
+    # plans use them too) don't need an entry.
+    field_columns = {}
+
+    def get_field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return ".".join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return fields
+
+        path = self.get_field_path()
+        selected = requested_names(request, "fields", path)
+        if selected:
+            for name in list(fields):
+                if name not in selected:
+                    del fields[name]
+
+        if getattr(self.context.get("view"), "action", None) in COMPACT_ACTIONS:
+            expand = requested_names(request, "expand", path)
+            for name in self.expandable_fields:
+                if name in fields and name not in expand:
+                    fields[name] = serializers.ReadOnlyField(source=f"{name}_id")
+        return fields
+
+    def is_expanded(self, name):
+        return isinstance(self.fields.get(name), serializers.BaseSerializer)
+
+    def get_columns(self):
+        model = self.Meta.model
+        columns = {model._meta.pk.name}
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in self.field_columns:
+                columns.update(self.field_columns[name])
+                continue
+            if hasattr(field, "value_columns"):
+                columns.update(field.value_columns)
+                continue
+            if field.source == "*":
+                return None
+            source = field.source.split(".")[0]
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue  # annotations
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return columns
+
+
+def get_relations(serializer, prefix="", many=False):
+    selects, prefetches = [], []
+    for field in serializer.fields.values():
+        if field.write_only or not isinstance(field, serializers.BaseSerializer):
+            continue
+        is_many = many or isinstance(field, serializers.ListSerializer)
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        path = f"{prefix}{field.source}"
+        (prefetches if is_many else selects).append(path)
+        child_selects, child_prefetches = get_relations(child, f"{path}__", is_many)
+        selects.extend(child_selects)
+        prefetches.extend(child_prefetches)
+    return selects, prefetches
+
+
+# Fetch only what `serializer` will render: joins and prefetches for the
+# relations it expands, and only() the columns it reads (plus `extra`).
+def sparse_queryset(queryset, serializer, extra=()):
+    selects, prefetches = get_relations(serializer)
+    queryset = (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .select_related(*selects)
+        .prefetch_related(*prefetches)
+    )
+
+    columns = serializer.get_columns()
+    if columns is None:
+        return queryset
+    return queryset.only(*columns, *extra)
+
+
+class SparseQuerysetMixin:
+    query_params = ("fields", "expand")
+
+    @classmethod
+    def pop_params(cls, data):
+        for param in cls.query_params:
+            data.pop(param, None)
+        return data
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != "GET":
+            return queryset
+        ordering = [name.lstrip("-") for name in getattr(self, "cursor_ordering", ())]
+        return sparse_queryset(queryset, self.get_serializer(), ordering)
@@ -0,0 +1,301 @@
+import csv
+import json
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.db import transaction
+from django.db.models import FloatField, Value
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app_control.models import Inventory, InventoryGroup, Shop
+from app_control.serializer import ShopWithAmountSerializer
+from app_control.views import InventoryView, ShopView
+from user_control.models import CustomUser, UserActivities
+from user_control.views import UserActivitiesView, UsersView
+from .fast_read import PlannedList, serialize_many
+from .principal_cache import build_principal_cache, get_principal_cache
+from .renderers import FastJSONRenderer
+from .response_cache import get_response_cache
+from .utils import CustomPagination, get_access_token, load_user
+
+
+class CursorView:
+    def __init__(self, ordering):
+        self.cursor_ordering = ordering
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Groups of three activities share a created_at, so pages split ties.
+        UserActivities.objects.bulk_create(
+            UserActivities(
+                email="user@example.com",
+                fullname="User",
+                action=f"action {n}",
+                created_at=now - timedelta(minutes=n // 3),
+            )
+            for n in range(25)
+        )
+
+    def paginate(self, ordering, cursor="", page_size=4):
+        request = Request(
+            APIRequestFactory().get("/", {"cursor": cursor, "page_size": page_size})
+        )
+        pagination = CustomPagination()
+        rows = pagination.paginate_queryset(
+            UserActivities.objects.all(), request, CursorView(ordering)
+        )
+        return rows, pagination.next_cursor
+
+    def walk(self, ordering, page_size=4):
+        ids = []
+        cursor = ""
+        while True:
+            rows, cursor = self.paginate(ordering, cursor, page_size)
+            self.assertLessEqual(len(rows), page_size)
+            ids += [row.id for row in rows]
+            if cursor is None:
+                return ids
+
+    def test_descending_pages_match_ordered_queryset(self):
+        ordering = ("-created_at", "id")
+        expected = list(
+            UserActivities.objects.order_by(*ordering).values_list("id", flat=True)
+        )
+        for page_size in (1, 2, 3, 4, 7, 25, 30):
+            self.assertEqual(self.walk(ordering, page_size), expected)
+
+    def test_ascending_pages_match_ordered_queryset(self):
+        ordering = ("created_at", "id")
+        expected = list(
+            UserActivities.objects.order_by(*ordering).values_list("id", flat=True)
+        )
+        for page_size in (1, 2, 3, 4, 7, 25, 30):
+            self.assertEqual(self.walk(ordering, page_size), expected)
+
+    def test_descending_id_tie_breaker(self):
+        ordering = ("-created_at", "-id")
+        expected = list(
+            UserActivities.objects.order_by(*ordering).values_list("id", flat=True)
+        )
+        self.assertEqual(self.walk(ordering, 2), expected)
+
+    def test_filter_bounds_leading_field(self):
+        pagination = CustomPagination()
+        pagination.ordering = ("-created_at", "id")
+        query = pagination.cursor_filter(["2026-01-01T00:00:00+00:00", 5])
+        self.assertIn(("created_at__lte", "2026-01-01T00:00:00+00:00"), query.children)
+
+        pagination.ordering = ("created_at", "id")
+        query = pagination.cursor_filter(["2026-01-01T00:00:00+00:00", 5])
+        self.assertIn(("created_at__gte", "2026-01-01T00:00:00+00:00"), query.children)
+
+    def test_next_link_carries_cursor(self):
+        request = Request(
+            APIRequestFactory().get("/activities", {"cursor": "", "page": 3})
+        )
+        pagination = CustomPagination()
+        pagination.paginate_queryset(
+            UserActivities.objects.all(), request, CursorView(("-created_at", "id"))
+        )
+        query = parse_qs(urlparse(pagination.get_next_cursor_link()).query)
+        self.assertEqual(query["cursor"], [pagination.next_cursor])
+        self.assertNotIn("page", query)
+
+    def test_invalid_cursors(self):
+        def encode(values):
+            return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+        ordering = ("-created_at", "id")
+        for cursor in (
+            "not base64!",
+            encode({"created_at": 1}),
+            encode(["2026-01-01T00:00:00+00:00"]),
+            encode(["2026-01-01T00:00:00+00:00", 1, 2]),
+            encode(["yesterday", 1]),
+            encode(["2026-01-01T00:00:00+00:00", "one"]),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(ordering, cursor)
+
+
+class FastReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(
+            email="owner@example.com", fullname="Owner \u2028 Name", role="admin"
+        )
+        CustomUser.objects.create(email="clerk@example.com", fullname="Clerk")
+        group = InventoryGroup.objects.create(name="Tools", created_by=user)
+        for n in range(5):
+            Inventory.objects.create(
+                name=f"Item {n}",
+                total=n,
+                price=n * 1.1,
+                group=group,
+                created_by=user,
+                photo=f"https://example.com/{n}.png" if n % 2 else None,
+            )
+            Shop.objects.create(name=f"Shop {n}", created_by=user)
+        UserActivities.objects.bulk_create(
+            UserActivities(email=user.email, fullname=user.fullname, action=f"a {n}")
+            for n in range(5)
+        )
+
+    def render_list(self, view_class, fast):
+        request = Request(APIRequestFactory().get("/"))
+        view = view_class(
+            request=request, action="list", format_kwarg=None, args=(), kwargs={}
+        )
+        with override_settings(FAST_READ=fast):
+            queryset = view.filter_queryset(view.get_queryset())
+            data = view.get_serializer(queryset, many=True).data
+        self.assertEqual(isinstance(data, PlannedList), fast)
+        return FastJSONRenderer().render(data)
+
+    def test_planned_lists_render_like_drf(self):
+        for view_class in (InventoryView, ShopView, UserActivitiesView, UsersView):
+            with self.subTest(view=view_class.__name__):
+                self.assertEqual(
+                    self.render_list(view_class, True),
+                    self.render_list(view_class, False),
+                )
+
+    def test_fallback_refetches_sliced_queryset(self):
+        for amount in (12.5, 1e20):
+            queryset = Shop.objects.select_related("created_by").annotate(
+                amount_total=Value(amount, FloatField())
+            )
+            queryset = queryset.order_by("name")[1:4]
+            with self.subTest(amount=amount):
+                self.assertEqual(
+                    FastJSONRenderer().render(
+                        serialize_many(ShopWithAmountSerializer, queryset)
+                    ),
+                    JSONRenderer().render(
+                        ShopWithAmountSerializer(queryset, many=True).data
+                    ),
+                )
+
+
+class PrincipalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email="principal@example.com", fullname="Principal", role="admin"
+        )
+
+    def setUp(self):
+        get_principal_cache().clear()
+        self.addCleanup(get_principal_cache().clear)
+
+    def test_hits_skip_the_query_and_return_copies(self):
+        cache = get_principal_cache()
+        cache.get_or_load(self.user.id, load_user)
+        with self.assertNumQueries(0):
+            user = cache.get_or_load(self.user.id, load_user)
+        user.fullname = "Changed"
+        self.assertEqual(
+            cache.get_or_load(self.user.id, load_user).fullname, "Principal"
+        )
+
+    def test_save_invalidates_after_commit(self):
+        cache = get_principal_cache()
+        cache.get_or_load(self.user.id, load_user)
+        user = CustomUser.objects.get(id=self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.role = "sale"
+            user.save()
+            self.assertEqual(cache.get_or_load(self.user.id, load_user).role, "admin")
+        self.assertEqual(cache.get_or_load(self.user.id, load_user).role, "sale")
+
+    @override_settings(PRINCIPAL_CACHE={"BACKEND": "local", "TTL": 300})
+    def test_local_entries_expire_after_local_ttl(self):
+        cache = build_principal_cache()
+        with mock.patch("inventory_api.principal_cache.time.monotonic") as monotonic:
+            monotonic.return_value = 1000.0
+            cache.get_or_load(self.user.id, load_user)
+            monotonic.return_value = 1004.0
+            with self.assertNumQueries(0):
+                cache.get_or_load(self.user.id, load_user)
+            monotonic.return_value = 1006.0
+            with self.assertNumQueries(1):
+                cache.get_or_load(self.user.id, load_user)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email="analyst@example.com", fullname="Analyst", role="admin"
+        )
+        cls.auth = {
+            "HTTP_AUTHORIZATION": "Bearer "
+            + get_access_token({"user_id": str(cls.user.id)}, 1)
+        }
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.addCleanup(get_response_cache().clear)
+
+    def get_sales(self):
+        response = self.client.get("/api/v1/app/sales_by_shop", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response["X-Cache"], [shop["name"] for shop in response.json()]
+
+    def test_committed_write_invalidates(self):
+        self.assertEqual(self.get_sales(), ("MISS", []))
+        self.assertEqual(self.get_sales(), ("HIT", []))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Shop.objects.create(created_by=self.user, name="New shop")
+            # Until the write commits, other connections can't see it.
+            self.assertEqual(self.get_sales(), ("HIT", []))
+        self.assertEqual(self.get_sales(), ("MISS", ["New shop"]))
+        self.assertEqual(self.get_sales(), ("HIT", ["New shop"]))
+
+    def test_rolled_back_write_keeps_entries(self):
+        self.get_sales()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Shop.objects.create(created_by=self.user, name="Rolled back")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.get_sales(), ("HIT", []))
+
+
+class ExportTests(TestCase):
+    def test_csv_cells_that_start_formulas_are_quoted(self):
+        user = CustomUser.objects.create(
+            email="exporter@example.com", fullname="Exporter", role="admin"
+        )
+        for name in ["=HYPERLINK(1)", "+1", "-1", "@SUM(A1)", "Plain", "a=b"]:
+            Inventory.objects.create(created_by=user, name=name, total=1, price=-1.5)
+
+        response = self.client.get(
+            "/api/v1/app/inventory/export/csv",
+            HTTP_AUTHORIZATION="Bearer "
+            + get_access_token({"user_id": str(user.id)}, 1),
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = list(
+            csv.DictReader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(
+            sorted(row["name"] for row in rows),
+            sorted(["'=HYPERLINK(1)", "'+1", "'-1", "'@SUM(A1)", "Plain", "a=b"]),
+        )
+        # Only strings are quoted, so negative numbers stay numbers.
+        self.assertEqual({row["price"] for row in rows}, {"-1.5"})
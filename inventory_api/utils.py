@@ -1,10 +1,20 @@
 import re
 import jwt
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from user_control.models import CustomUser
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django.db.models import Q
+from .principal_cache import get_principal_cache
 
 
 def get_access_token(payload, expiry):
@@ -27,14 +37,219 @@ def decode_jwt(payload):
         return None
 
     if decoded:
+        return get_principal_cache().get_or_load(
+            decoded.get("user_id", None), load_user
+        )
+
+
+def load_user(user_id):
+    try:
+        return CustomUser.objects.get(id=user_id)
+    except:
+        return None
+
+
+class ApproximateCountPaginator(Paginator):
+    # For unfiltered querysets on Postgres the planner's row estimate is used
+    # instead of COUNT(*) once the table is larger than
+    # APPROXIMATE_COUNT_THRESHOLD rows; smaller tables still count exactly.
+    approximate = False
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        threshold = getattr(settings, "APPROXIMATE_COUNT_THRESHOLD", 10000)
+        if estimate is not None and estimate >= threshold:
+            self.approximate = True
+            return estimate
+        return super().count
+
+    def validate_number(self, number):
         try:
-            return CustomUser.objects.get(id=decoded.get("user_id", None))
-        except:
+            return super().validate_number(number)
+        except EmptyPage:
+            # The estimate may undercount, so pages past it are still served.
+            if self.approximate:
+                return int(number)
+            raise
+
+    def estimate_count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is None or query.where.children or query.distinct:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
             return None
+        with connection.cursor() as cursor:
+            # A partitioned table has no rows of its own (reltuples is -1 or
+            # 0), so its partitions' estimates are added up instead.
+            cursor.execute(
+                "SELECT CASE WHEN c.relkind = 'p' THEN ("
+                "SELECT CASE WHEN bool_and(p.reltuples < 0) THEN -1 "
+                "ELSE SUM(GREATEST(p.reltuples, 0)) END "
+                "FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid "
+                "WHERE i.inhparent = c.oid) ELSE c.reltuples END "
+                "FROM pg_class c WHERE c.oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that have never been analyzed.
+        if row is None or row[0] is None or row[0] < 0:
+            return None
+        return int(row[0])
 
 
 class CustomPagination(PageNumberPagination):
+    django_paginator_class = ApproximateCountPaginator
     page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    query_params = ("page", "page_size", "cursor", "count")
+
+    # Three modes share this class:
+    # - ?page=N (default): numbered pages with an exact total count.
+    # - ?page=N&count=false: numbered pages without the COUNT(*) query.
+    # - ?cursor= (empty for the first page): keyset pagination on the view's
+    #   cursor_ordering, so every page is an index range scan whatever its
+    #   depth. Responses carry only `next` and `results`.
+
+    @classmethod
+    def pop_params(cls, data):
+        for param in cls.query_params:
+            data.pop(param, None)
+        return data
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.cursor_query_param in request.query_params:
+            self.mode = "cursor"
+            return self.paginate_cursor(queryset, request, view)
+        if request.query_params.get(self.count_query_param) in ("0", "false"):
+            self.mode = "no_count"
+            return self.paginate_without_count(queryset, request)
+        self.mode = "page"
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.mode == "cursor":
+            return Response({"next": self.get_next_cursor_link(), "results": data})
+        if self.mode == "no_count":
+            return Response(
+                {
+                    "next": self.get_next_page_link(),
+                    "previous": self.get_previous_page_link(),
+                    "results": data,
+                }
+            )
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_approximate": self.page.paginator.approximate,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound("Invalid page.")
+        if self.page_number < 1:
+            raise NotFound("Invalid page.")
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset : offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_page_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_page_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_cursor_ordering(self, queryset, view):
+        ordering = getattr(view, "cursor_ordering", None)
+        if not ordering:
+            ordering = (*queryset.model._meta.ordering, "id")
+        if "search_rank" in queryset.query.annotations:
+            ordering = ("search_rank", *ordering)
+        return ordering
+
+    def paginate_cursor(self, queryset, request, view):
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_cursor_ordering(queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(
+                    self.cursor_filter(self.decode_cursor(cursor))
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound("Invalid cursor.")
+
+        rows = list(queryset[: page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = self.encode_cursor(rows[-1])
+        return rows
+
+    def cursor_filter(self, values):
+        # (a, b) after (x, y) is a > x OR (a = x AND b > y), with < for
+        # descending fields. The leading a >= x is implied, but spelling it
+        # out lets the database start an index range scan at the cursor
+        # instead of filtering down from the top of the index.
+        first = self.ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        bound = Q(**{f"{first.lstrip('-')}__{lookup}": values[0]})
+        query = None
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{name}__{lookup}": values[index]})
+            for previous, value in zip(self.ordering[:index], values):
+                condition &= Q(**{previous.lstrip("-"): value})
+            query = condition if query is None else query | condition
+        return bound & query
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound("Invalid cursor.")
+        return values
+
+    def get_next_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
 
 
 def normalize_query(
@@ -61,4 +276,4 @@ def get_query(query_string, search_fields):
         else:
             query = query & or_query
 
-        return query
+    return query
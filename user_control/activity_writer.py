@@ -0,0 +1,192 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import UserActivities
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACTIVITY_WRITER = {
+    "MODE": "async",
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_QUEUE_SIZE": 10000,
+}
+
+_STOP = object()
+
+
+class ActivityWriter:
+    def __init__(self, mode, batch_size, flush_interval, max_queue_size):
+        if mode not in ("async", "sync"):
+            raise ValueError(f"Unknown activity writer mode '{mode}'")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def add(self, activity):
+        if self.mode == "sync":
+            self.write([activity])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(activity)
+        except queue.Full:
+            # Backpressure: write inline rather than dropping the event.
+            self.write([activity])
+
+    def write(self, activities):
+        started = time.monotonic()
+        try:
+            UserActivities.objects.bulk_create(activities)
+            written = len(activities)
+        except Exception:
+            logger.exception("Failed to write %s user activities", len(activities))
+            # One bad row (e.g. its user was deleted before the flush) fails
+            # the whole INSERT, so retry row by row and only drop bad rows.
+            written = self.write_rows(activities) if len(activities) > 1 else 0
+
+        elapsed = (time.monotonic() - started) * 1000
+        with self._lock:
+            self.written += written
+            self.failed += len(activities) - written
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+
+    def write_rows(self, activities):
+        written = 0
+        for activity in activities:
+            try:
+                UserActivities.objects.bulk_create([activity])
+            except Exception as e:
+                logger.error("Dropped user activity %r: %s", activity.action, e)
+            else:
+                written += 1
+        return written
+
+    def flush(self):
+        batch = self._drain_nowait()
+        if batch:
+            self.write(batch)
+
+    def shutdown(self, timeout=10):
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "queue_depth": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 3)
+            if self.batches
+            else 0.0,
+        }
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            # A worker inherited through fork() is not running in this process.
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                self._pid = pid
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                close_old_connections()
+                self.write(batch)
+        close_old_connections()
+
+    def _next_batch(self):
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if item is _STOP:
+            return self._drain_nowait(), True
+
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch + self._drain_nowait(), True
+            batch.append(item)
+        return batch, False
+
+    def _drain_nowait(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            if item is not _STOP:
+                batch.append(item)
+
+
+def build_activity_writer():
+    config = {
+        **DEFAULT_ACTIVITY_WRITER,
+        **getattr(settings, "ACTIVITY_WRITER", {}),
+    }
+    return ActivityWriter(
+        config["MODE"],
+        config["BATCH_SIZE"],
+        config["FLUSH_INTERVAL"],
+        config["MAX_QUEUE_SIZE"],
+    )
+
+
+_activity_writer = None
+_activity_writer_lock = threading.Lock()
+
+
+def get_activity_writer():
+    global _activity_writer
+    if _activity_writer is None:
+        with _activity_writer_lock:
+            if _activity_writer is None:
+                _activity_writer = build_activity_writer()
+                atexit.register(_activity_writer.shutdown)
+    return _activity_writer
@@ -0,0 +1,133 @@
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from user_control.models import UserActivities
+from user_control.partitions import (
+    add_months,
+    archive_path,
+    create_partition,
+    default_partition_months,
+    drop_partition,
+    get_partitions_config,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    partition_name,
+    quote,
+    write_archive,
+)
+from user_control.serializer import UserActivitySerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the user activity partitions for the coming months and move "
+        "months older than the retention period to gzipped NDJSON archives"
+    )
+
+    def add_arguments(self, parser):
+        config = get_partitions_config()
+        parser.add_argument(
+            "--premake-months",
+            type=int,
+            default=config["PREMAKE_MONTHS"],
+            help="Months after the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=config["RETENTION_MONTHS"],
+            help="Months (the current one included) to keep in the database",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print what would be done without changing anything",
+        )
+
+    def handle(self, *args, **options):
+        if options["retention_months"] < 1:
+            raise CommandError("--retention-months must be at least 1")
+        self.dry_run = options["dry_run"]
+        self.table = UserActivities._meta.db_table
+        self.config = get_partitions_config()
+
+        current = month_start(timezone.now())
+        cutoff = add_months(current, 1 - options["retention_months"])
+        partitioned = is_partitioned(self.table)
+        partitions = list_partitions(self.table) if partitioned else {}
+
+        if partitioned:
+            months = [
+                add_months(current, n) for n in range(options["premake_months"] + 1)
+            ]
+            # Rows that fell into the default partition get a partition of
+            # their own, unless they are about to be archived.
+            months += default_partition_months(self.table, "created_at")
+            for month in sorted(set(months)):
+                if month >= cutoff and month not in partitions:
+                    self.run(
+                        f"Created {partition_name(self.table, month)}",
+                        create_partition,
+                        self.table,
+                        "created_at",
+                        month,
+                    )
+
+        expired = UserActivities.objects.filter(created_at__lt=cutoff).datetimes(
+            "created_at", "month", tzinfo=dt_timezone.utc
+        )
+        months = set(expired) | {month for month in partitions if month < cutoff}
+        for month in sorted(months):
+            self.archive_month(month, month in partitions)
+
+    def run(self, message, function, *args):
+        if self.dry_run:
+            self.stdout.write(f"[dry run] {message}")
+            return
+        function(*args)
+        self.stdout.write(message)
+
+    def archive_month(self, month, has_partition):
+        queryset = UserActivities.objects.filter(
+            created_at__gte=month, created_at__lt=add_months(month, 1)
+        ).order_by("created_at", "id")
+
+        if self.dry_run:
+            self.stdout.write(
+                f"[dry run] Archived {queryset.count()} activities from {month:%Y-%m}"
+            )
+            return
+
+        with transaction.atomic():
+            if has_partition:
+                # Nothing can be written to the month while it is archived.
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LOCK TABLE {quote(partition_name(self.table, month))} "
+                        "IN SHARE MODE"
+                    )
+            count = queryset.count()
+            if count:
+                path = archive_path(self.config["ARCHIVE_DIR"], month)
+                written = write_archive(
+                    queryset,
+                    UserActivitySerializer(),
+                    path,
+                    self.config["CHUNK_SIZE"],
+                )
+                if written != count:
+                    raise CommandError(
+                        f"Wrote {written} of {count} activities to {path}"
+                    )
+                self.stdout.write(f"Archived {count} activities to {path}")
+
+            if has_partition:
+                drop_partition(self.table, month)
+                self.stdout.write(f"Dropped {partition_name(self.table, month)}")
+            # Without a partition (or for rows in the default partition) the
+            # archived rows are deleted.
+            queryset.delete()
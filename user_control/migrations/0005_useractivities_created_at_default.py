@@ -0,0 +1,21 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_control", "0004_customuser_shop_id"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivities",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+    ]
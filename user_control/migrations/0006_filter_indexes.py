@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_control", "0005_useractivities_created_at_default"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivities",
+            name="email",
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AddIndex(
+            model_name="useractivities",
+            index=models.Index(
+                fields=["-created_at", "id"], name="activity_created_at_id"
+            ),
+        ),
+    ]
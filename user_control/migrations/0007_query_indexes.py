@@ -0,0 +1,27 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_control", "0006_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                condition=models.Q(("is_superuser", False)),
+                fields=["id"],
+                name="user_not_superuser",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="useractivities",
+            index=models.Index(
+                fields=["user", "-created_at"], name="activity_user_created_at"
+            ),
+        ),
+    ]
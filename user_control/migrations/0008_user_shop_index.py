@@ -0,0 +1,21 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_control", "0007_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                condition=models.Q(("is_superuser", False)),
+                fields=["shop_id", "id"],
+                name="user_shop_id",
+            ),
+        ),
+    ]
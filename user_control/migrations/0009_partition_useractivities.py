@@ -0,0 +1,138 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+
+# A frozen copy of the partitioning SQL as it was when this migration was
+# written, so later changes to user_control.partitions or to settings don't
+# change what it does.
+TABLE = "user_control_useractivities"
+COLUMN = "created_at"
+PREMAKE_MONTHS = 3
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def get_table_definitions(cursor, quote):
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+        [TABLE, f"{TABLE}_pkey"],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE],
+    )
+    constraints = [
+        f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} {definition}"
+        for name, definition in cursor.fetchall()
+    ]
+    return indexes + constraints
+
+
+def partition_activities(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    quote = connection.ops.quote_name
+    UserActivities = apps.get_model("user_control", "UserActivities")
+    first = UserActivities.objects.order_by(COLUMN).first()
+    now = month_start(timezone.now())
+    month = now if first is None else min(month_start(first.created_at), now)
+    last = add_months(now, PREMAKE_MONTHS)
+
+    old_table = f"{TABLE}_unpartitioned"
+    sequence = f"{TABLE}_id_seq"
+    with connection.cursor() as cursor:
+        definitions = get_table_definitions(cursor, quote)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {quote(TABLE)}")
+        last_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old_table)}")
+        cursor.execute(
+            f"ALTER TABLE {quote(old_table)} "
+            f"RENAME CONSTRAINT {quote(TABLE + '_pkey')} TO {quote(old_table + '_pkey')}"
+        )
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old_table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({quote(COLUMN)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id, {quote(COLUMN)})"
+        )
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} DEFAULT"
+        )
+        while month <= last:
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{TABLE}_p{month:%Y_%m}')} "
+                f"PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)",
+                [month.isoformat(), add_months(month, 1).isoformat()],
+            )
+            month = add_months(month, 1)
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old_table)}")
+        cursor.execute(f"DROP TABLE {quote(old_table)}")
+
+        # Identity columns can't be used on partitioned tables.
+        cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(TABLE)}.id")
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, last_id + 1])
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ALTER COLUMN id "
+            f"SET DEFAULT nextval('{sequence}')"
+        )
+        for definition in definitions:
+            cursor.execute(definition)
+
+
+def unpartition_activities(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    quote = connection.ops.quote_name
+
+    old_table = f"{TABLE}_partitioned"
+    with connection.cursor() as cursor:
+        definitions = get_table_definitions(cursor, quote)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {quote(TABLE)}")
+        last_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old_table)}")
+        cursor.execute(
+            f"ALTER TABLE {quote(old_table)} "
+            f"RENAME CONSTRAINT {quote(TABLE + '_pkey')} TO {quote(old_table + '_pkey')}"
+        )
+        cursor.execute(f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old_table)})")
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id)")
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old_table)}")
+        cursor.execute(f"DROP TABLE {quote(old_table)}")
+
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ALTER COLUMN id "
+            "ADD GENERATED BY DEFAULT AS IDENTITY"
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, false)",
+            [TABLE, last_id + 1],
+        )
+        for definition in definitions:
+            cursor.execute(definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_control", "0008_user_shop_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activities, unpartition_activities),
+    ]
@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
+from inventory_api.principal_cache import get_principal_cache
+from inventory_api.response_cache import get_response_cache
 
 Roles = (("admin", "admin"), ("creator", "creator"), ("sale", "sale"))
 
@@ -46,24 +49,84 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     objects = CustomUserManager()
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.old_email = self.__dict__.get("email")
+        self.old_fullname = self.__dict__.get("fullname")
+        self.old_is_superuser = self.__dict__.get("is_superuser")
+        self.old_role = self.__dict__.get("role")
+        self.old_shop_id = self.__dict__.get("shop_id")
+
     def __str__(self) -> str:
         return self.email
 
+    @property
+    def identity_changed(self):
+        return self.email != self.old_email or self.fullname != self.old_fullname
+
+    @property
+    def directory_changed(self):
+        return (
+            self.fullname != self.old_fullname
+            or self.role != self.old_role
+            or self.shop_id != self.old_shop_id
+            or self.is_superuser != self.old_is_superuser
+        )
+
+    def save(self, *args, **kwargs):
+        directory_changed = self._state.adding or self.directory_changed
+        super().save(*args, **kwargs)
+        self.old_email = self.email
+        self.old_fullname = self.fullname
+        self.old_is_superuser = self.is_superuser
+        self.old_role = self.role
+        self.old_shop_id = self.shop_id
+        # After commit, so a concurrent request can't cache the old row again.
+        user_id = self.pk
+        transaction.on_commit(lambda: get_principal_cache().invalidate(user_id))
+        if directory_changed:
+            get_response_cache().invalidate("users")
+
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: get_principal_cache().invalidate(user_id))
+        get_response_cache().invalidate("users")
+
     class Meta:
         ordering = ("pk",)
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(is_superuser=False),
+                name="user_not_superuser",
+            ),
+            models.Index(
+                fields=["shop_id", "id"],
+                condition=models.Q(is_superuser=False),
+                name="user_shop_id",
+            ),
+        ]
 
 
 class UserActivities(models.Model):
     user = models.ForeignKey(
         CustomUser, related_name="activities", null=True, on_delete=models.SET_NULL
     )
-    email = models.EmailField()
+    email = models.EmailField(db_index=True)
     fullname = models.CharField(max_length=255)
     action = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the activity is recorded, not when the writer flushes it.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self) -> str:
         return f"{self.fullname} {self.action} on {self.created_at.strftime('%m/%d/%Y %H:%M')}"
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at", "id"], name="activity_created_at_id"),
+            models.Index(
+                fields=["user", "-created_at"], name="activity_user_created_at"
+            ),
+        ]
@@ -0,0 +1,155 @@
+import gzip
+import os
+import re
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventory_api.export import ndjson_lines, serialized_batches
+
+DEFAULT_ACTIVITY_PARTITIONS = {
+    "RECENT_MONTHS": 3,
+    "PREMAKE_MONTHS": 3,
+    "RETENTION_MONTHS": 12,
+    "ARCHIVE_DIR": "activity_archive",
+    "CHUNK_SIZE": 5000,
+}
+
+# On Postgres UserActivities is a table partitioned by month on created_at:
+# <table>_pYYYY_MM for each month plus <table>_default for rows no monthly
+# partition covers yet. Months are UTC calendar months.
+
+
+def get_partitions_config():
+    return {
+        **DEFAULT_ACTIVITY_PARTITIONS,
+        **getattr(settings, "ACTIVITY_PARTITIONS", {}),
+    }
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def recent_since(months=None):
+    if months is None:
+        months = get_partitions_config()["RECENT_MONTHS"]
+    return add_months(month_start(timezone.now()), 1 - months)
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def is_partitioned(table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            month = datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)
+            partitions[month] = name
+    return partitions
+
+
+def default_partition_months(table, column):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {quote(column)} AT TIME ZONE 'UTC') "
+            f"FROM {quote(default_partition_name(table))}"
+        )
+        return sorted(
+            row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall()
+        )
+
+
+def create_partition(table, column, month):
+    name = partition_name(table, month)
+    bounds = [month.isoformat(), add_months(month, 1).isoformat()]
+    default = quote(default_partition_name(table))
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Rows for the month that landed in the default partition have to be
+        # moved out before the new partition can be attached.
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default} "
+            f"WHERE {quote(column)} >= %s AND {quote(column)} < %s RETURNING *) "
+            f"INSERT INTO {quote(name)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+    return name
+
+
+def drop_partition(table, month):
+    name = partition_name(table, month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+        cursor.execute(f"DROP TABLE {quote(name)}")
+    return name
+
+
+def archive_path(directory, month):
+    base = os.path.join(str(directory), f"user_activities_{month:%Y_%m}")
+    path = f"{base}.ndjson.gz"
+    attempt = 1
+    while os.path.exists(path):
+        attempt += 1
+        path = f"{base}.{attempt}.ndjson.gz"
+    return path
+
+
+# Write the activities in `queryset` to a gzipped NDJSON file (the format
+# of /user/activities/export/ndjson) and return the number of rows written.
+def write_archive(queryset, serializer, path, chunk_size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    written = 0
+    with gzip.open(tmp_path, "wb") as destination:
+        for lines in ndjson_lines(serialized_batches(serializer, queryset, chunk_size)):
+            destination.write(lines)
+            written += lines.count(b"\n")
+    os.replace(tmp_path, path)
+    return written
@@ -26,6 +26,12 @@ class CustomUserSerializer(serializers.ModelSerializer):
         exclude = ("password",)
 
 
+class UserDirectorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ("id", "fullname", "role", "shop_id")
+
+
 class UserActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = UserActivities
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from inventory_api.response_cache import get_response_cache
+from inventory_api.utils import ApproximateCountPaginator, get_access_token
+from .activity_writer import ActivityWriter, get_activity_writer
+from .models import CustomUser, UserActivities
+from .partitions import (
+    add_months,
+    create_partition,
+    default_partition_name,
+    drop_partition,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+from .serializer import UserActivitySerializer
+from .views import UserActivitiesView, add_user_Activity
+
+TABLE = UserActivities._meta.db_table
+
+
+def new_activities(count):
+    return [
+        UserActivities(email="user@example.com", fullname="User", action=f"action {n}")
+        for n in range(count)
+    ]
+
+
+def add_activities(*dates):
+    return UserActivities.objects.bulk_create(
+        UserActivities(
+            email="user@example.com",
+            fullname="User",
+            action=f"action {n}",
+            created_at=date,
+        )
+        for n, date in enumerate(dates)
+    )
+
+
+def partition_of(activity):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT tableoid::regclass::text FROM {TABLE} WHERE id = %s",
+            [activity.id],
+        )
+        return cursor.fetchone()[0]
+
+
+@skipUnless(connection.vendor == "postgresql", "Only partitioned on Postgres")
+class ActivityPartitionTests(TestCase):
+    def setUp(self):
+        self.current = month_start(timezone.now())
+
+    def test_rows_are_routed_by_month(self):
+        self.assertTrue(is_partitioned(TABLE))
+        partitions = list_partitions(TABLE)
+        for months in range(4):
+            self.assertIn(add_months(self.current, months), partitions)
+
+        recent, old = add_activities(timezone.now(), add_months(self.current, -14))
+        self.assertEqual(partition_of(recent), partition_name(TABLE, self.current))
+        self.assertEqual(partition_of(old), default_partition_name(TABLE))
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        month = add_months(self.current, -14)
+        (activity,) = add_activities(month + timedelta(days=3))
+
+        create_partition(TABLE, "created_at", month)
+        self.assertIn(month, list_partitions(TABLE))
+        self.assertEqual(partition_of(activity), partition_name(TABLE, month))
+
+        drop_partition(TABLE, month)
+        self.assertNotIn(month, list_partitions(TABLE))
+        self.assertFalse(UserActivities.objects.filter(id=activity.id).exists())
+
+    def test_count_estimate_adds_up_partitions(self):
+        add_activities(*[timezone.now()] * 30, *[add_months(self.current, -14)] * 20)
+        # Autovacuum analyzes the partitions, never the partitioned table.
+        with connection.cursor() as cursor:
+            for name in [
+                *list_partitions(TABLE).values(),
+                default_partition_name(TABLE),
+            ]:
+                cursor.execute(f"ANALYZE {name}")
+        paginator = ApproximateCountPaginator(UserActivities.objects.all(), 10)
+        self.assertEqual(paginator.estimate_count(), 50)
+
+
+class ActivityArchiveTests(TestCase):
+    def test_expired_months_are_archived_and_deleted(self):
+        current = month_start(timezone.now())
+        expired = add_activities(
+            add_months(current, -13) + timedelta(days=5),
+            add_months(current, -20),
+            add_months(current, -13) + timedelta(days=2, hours=1),
+        )
+        (recent,) = add_activities(timezone.now())
+        expected = json.loads(
+            JSONRenderer().render(
+                UserActivitySerializer(
+                    UserActivities.objects.filter(
+                        id__in=[activity.id for activity in expired]
+                    ).order_by("created_at", "id"),
+                    many=True,
+                ).data
+            )
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(ACTIVITY_PARTITIONS={"ARCHIVE_DIR": directory}):
+                call_command(
+                    "maintain_activity_partitions",
+                    retention_months=12,
+                    stdout=StringIO(),
+                )
+            names = sorted(os.listdir(directory))
+            archived = []
+            for name in names:
+                with gzip.open(os.path.join(directory, name)) as source:
+                    archived += [json.loads(line) for line in source]
+
+        self.assertEqual(
+            names,
+            [
+                f"user_activities_{add_months(current, -20):%Y_%m}.ndjson.gz",
+                f"user_activities_{add_months(current, -13):%Y_%m}.ndjson.gz",
+            ],
+        )
+        self.assertEqual(archived, expected)
+        self.assertEqual(
+            list(UserActivities.objects.values_list("id", flat=True)), [recent.id]
+        )
+
+
+class ActivityListTests(TestCase):
+    def list_ids(self, params):
+        request = Request(APIRequestFactory().get("/", params))
+        view = UserActivitiesView(
+            request=request, action="list", format_kwarg=None, args=(), kwargs={}
+        )
+        return set(view.get_queryset().values_list("id", flat=True))
+
+    def test_recent_window_is_opt_in(self):
+        recent, old = add_activities(
+            timezone.now(), add_months(month_start(timezone.now()), -6)
+        )
+        self.assertEqual(self.list_ids({}), {recent.id, old.id})
+        self.assertEqual(self.list_ids({"recent": "1"}), {recent.id})
+        self.assertEqual(self.list_ids({"recent": "0"}), {recent.id, old.id})
+
+
+class ActivityWriterTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="writer@example.com", fullname="Writer", role="admin"
+        )
+
+    def test_tests_write_synchronously(self):
+        self.assertEqual(get_activity_writer().mode, "sync")
+
+    def test_rolled_back_activities_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    add_user_Activity(self.user, "rolled back")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            add_user_Activity(self.user, "committed")
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            list(UserActivities.objects.values_list("action", flat=True)),
+            ["committed"],
+        )
+
+    def test_shutdown_flushes_queued_activities(self):
+        writer = ActivityWriter("async", 200, 60, 100)
+        for activity in new_activities(3):
+            writer._queue.put(activity)
+
+        writer.shutdown()
+        self.assertEqual(UserActivities.objects.count(), 3)
+        self.assertEqual(writer.stats()["queue_depth"], 0)
+        self.assertEqual(writer.written, 3)
+
+
+class ActivityWriterThreadTests(TransactionTestCase):
+    def test_worker_writes_in_batches_and_drains_on_shutdown(self):
+        # A long flush interval means batches are only cut by BATCH_SIZE and
+        # the last, partial one is only written by shutdown().
+        writer = ActivityWriter("async", 2, 60, 100)
+        for activity in new_activities(5):
+            writer.add(activity)
+
+        writer.shutdown()
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(UserActivities.objects.count(), 5)
+        self.assertEqual(writer.stats()["batches"], 3)
+        self.assertEqual(writer.stats()["failed"], 0)
+
+
+class UserDirectoryTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            email="directory@example.com", fullname="Before", role="sale"
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": "Bearer "
+            + get_access_token({"user_id": str(self.user.id)}, 1)
+        }
+        get_response_cache().clear()
+        self.addCleanup(get_response_cache().clear)
+
+    def get_directory(self):
+        response = self.client.get("/api/v1/user/users/directory", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response["X-Cache"], [user["fullname"] for user in response.json()]
+
+    def test_directory_refreshes_after_a_user_update(self):
+        self.assertEqual(self.get_directory(), ("MISS", ["Before"]))
+        self.assertEqual(self.get_directory(), ("HIT", ["Before"]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.fullname = "After"
+            self.user.save()
+        self.assertEqual(self.get_directory(), ("MISS", ["After"]))
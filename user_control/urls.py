@@ -3,6 +3,7 @@ from .views import (
     CreateUserView,
     LoginView,
     MeView,
+    MetricsView,
     UpdatePasswordView,
     UserActivitiesView,
     UsersView,
@@ -17,5 +18,6 @@ router.register("profile", MeView, "profile")
 router.register("update_password", UpdatePasswordView, "update_password")
 router.register("users", UsersView, "users")
 router.register("activities", UserActivitiesView, "activities")
+router.register("metrics", MetricsView, "metrics")
 
 urlpatterns = [path("user/", include(router.urls))]
@@ -1,5 +1,13 @@
 from inventory_api.custom_methods import IsAuthenticatedCustom
-from inventory_api.utils import get_access_token, CustomPagination, get_query
+from inventory_api.export import ExportMixin
+from inventory_api.fast_read import FastReadMixin, serialize_many
+from inventory_api.utils import get_access_token, CustomPagination
+from inventory_api.search import search
+from inventory_api.filters import FilterField, QueryFilter, RANGE_LOOKUPS
+from inventory_api.principal_cache import get_principal_cache
+from inventory_api.response_cache import cached_response, get_response_cache
+from .activity_writer import get_activity_writer
+from .partitions import recent_since
 from .serializer import (
     CreateUserSerializer,
     CustomUser,
@@ -8,18 +16,24 @@ from .serializer import (
     UpdatePasswordSerializer,
     UserActivitySerializer,
     UserActivities,
+    UserDirectorySerializer,
 )
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
-from rest_framework import status
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers, status
 from datetime import datetime
 
 
 def add_user_Activity(user, action):
-    UserActivities.objects.create(
+    activity = UserActivities(
         user_id=user.id, email=user.email, fullname=user.fullname, action=action
     )
+    # Only recorded if the surrounding transaction commits.
+    transaction.on_commit(lambda: get_activity_writer().add(activity))
 
 
 class CreateUserView(ModelViewSet):
@@ -114,12 +128,23 @@ class MeView(ModelViewSet):
         return Response(data)
 
 
-class UserActivitiesView(ModelViewSet):
+class UserActivitiesView(ExportMixin, FastReadMixin, ModelViewSet):
     serializer_class = UserActivitySerializer
     http_method_names = ["get"]
     queryset = UserActivities.objects.all().select_related("user")
     permission_classes = (IsAuthenticatedCustom,)
     pagination_class = CustomPagination
+    cursor_ordering = ("-created_at", "id")
+    query_filter = QueryFilter(
+        user_id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        email=FilterField(serializers.EmailField()),
+        created_at=FilterField(serializers.DateTimeField(), RANGE_LOOKUPS),
+        # ?recent=1 reads only the partitions of the last RECENT_MONTHS.
+        recent=FilterField(
+            serializers.BooleanField(),
+            to_q=lambda recent: Q(created_at__gte=recent_since()) if recent else Q(),
+        ),
+    )
 
     def get_queryset(self):
         if self.request.method.lower() != "get":
@@ -127,30 +152,68 @@ class UserActivitiesView(ModelViewSet):
 
         data = self.request.query_params.dict()
 
-        data.pop("page", None)
+        CustomPagination.pop_params(data)
 
         keyword = data.pop("keyword", None)
 
-        results = self.queryset.filter(**data)
+        results = self.query_filter.apply(self.queryset, data)
 
         if keyword:
             search_fields = (
                 "fullname",
                 "action",
             )
-            query = get_query(keyword, search_fields)
-            results = results.filter(query)
+            results = search(results, keyword, search_fields)
 
         return results
 
 
-class UsersView(ModelViewSet):
+class UsersView(ExportMixin, FastReadMixin, ModelViewSet):
     serializer_class = CustomUserSerializer
     http_method_names = ["get"]
     queryset = CustomUser.objects.all()
     permission_classes = (IsAuthenticatedCustom,)
+    pagination_class = CustomPagination
+    cursor_ordering = ("id",)
+    query_filter = QueryFilter(
+        id=FilterField(serializers.IntegerField(), ("exact", "in")),
+        shop_id=FilterField(serializers.IntegerField(), ("exact", "in", "isnull")),
+    )
+
+    def get_queryset(self):
+        if self.action == "retrieve":
+            return self.queryset
+
+        data = self.request.query_params.dict()
+
+        CustomPagination.pop_params(data)
+
+        return self.query_filter.apply(
+            self.queryset.filter(is_superuser=False), data
+        ).order_by("id")
+
+    # The id, name, role and shop of every user, for pickers and labels.
+    # Cached until a user is added, removed or changes one of those (for up
+    # to the default TTL with the per-process "local" backend).
+    @action(detail=False, methods=["get"])
+    @cached_response("user_directory", scope="users")
+    def directory(self, request):
+        return Response(
+            serialize_many(UserDirectorySerializer, self.get_queryset()),
+            status=status.HTTP_200_OK,
+        )
+
+
+class MetricsView(ModelViewSet):
+    http_method_names = ["get"]
+    queryset = CustomUser.objects.none()
+    permission_classes = (IsAuthenticatedCustom,)
 
     def list(self, _):
-        users = self.queryset.filter(is_superuser=False)
-        data = self.serializer_class(users, many=True).data
-        return Response(data)
+        return Response(
+            {
+                "principal_cache": get_principal_cache().stats(),
+                "activity_writer": get_activity_writer().stats(),
+                "response_cache": get_response_cache().stats(),
+            }
+        )